@@ -1,78 +1,87 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-# === CANGRID path resolver (cross‑platform) ===
-from pathlib import Path
-import os
-
-def _guess_data_dir() -> Path:
-    here = Path(__file__).resolve().parent
-    candidates = [
-        here / "data",
-        here.parent / "data",
-        Path.cwd() / "data",
-        Path(os.getenv("CANGRID_DATA_DIR", "")).expanduser() if os.getenv("CANGRID_DATA_DIR") else None,
-    ]
-    tried = []
-    for d in candidates:
-        if d:
-            tried.append(str(d))
-            if d.exists():
-                return d
-    raise FileNotFoundError(
-        "Could not find a 'data' directory.\n"
-        f"Tried: {tried}\n"
-        f"Current working directory: {Path.cwd()}\n"
-        f"Script location: {here}"
-    )
-
-DATA_DIR = _guess_data_dir()
+from cache_utils import data_dir
+
+DATA_DIR = data_dir()
 
 
 file = DATA_DIR / "AESO.csv"
 
-projections = pd.read_csv(file)
-years = []
-for i in range(2022,2042):
-    years.append(i)
-
-Natural_Gas_Combined_Cycle = []
-Cogeneration = []
-Natural_Gas_Simple_Cycle= []
-
-for i in range(len(projections)):
-    if projections['Scenario'][i] == 'Dispatchable Dominant' and projections['Output'][i] == 'Generation_MWh':
-        if projections['Fuel Type'][i] == 'Natural Gas Combined-Cycle':
-            Natural_Gas_Combined_Cycle.append(int(projections[' Value '][i].replace(",","")))
-        if projections['Fuel Type'][i] == 'Cogeneration':
-            Cogeneration.append(int(projections[' Value '][i].replace(",","")))
-        if projections['Fuel Type'][i] == 'Natural Gas Simple-Cycle':
-             Natural_Gas_Simple_Cycle.append(int(projections[' Value '][i].replace(",","")))
-            
-DDprojections = pd.DataFrame({
-    'Natural Gas Combined-Cycle':Natural_Gas_Combined_Cycle,
-    'Cogeneration':Cogeneration,
-    'Natural Gas Simple-Cycle':Natural_Gas_Simple_Cycle
-                      }, index = years)
-DDprojections['Total'] = DDprojections['Natural Gas Combined-Cycle'] + DDprojections['Cogeneration'] + DDprojections['Natural Gas Simple-Cycle']
-DDprojections['ratio CC'] = DDprojections['Natural Gas Combined-Cycle'] / DDprojections['Total']
-DDprojections['ratio Cogen'] = DDprojections['Cogeneration'] / DDprojections['Total']
-DDprojections['ratio SC'] = DDprojections['Natural Gas Simple-Cycle'] / DDprojections['Total']
-
-fig, ax = plt.subplots()
-
-plt.plot(DDprojections['Total'], label = 'Total')
-plt.plot(DDprojections['Cogeneration'], label = 'Cogeneration')
-plt.plot(DDprojections['Natural Gas Combined-Cycle'], label = 'Combined-Cycle')
-plt.plot(DDprojections['Natural Gas Simple-Cycle'], label = 'Simple-Cycle')
-
-ticks = plt.gca().get_xticks()
-labels = plt.gca().get_xticklabels()
-plt.gca().set_xticks(ticks[::2])
-plt.gca().set_xticklabels(labels[::2])
-
-plt.legend(loc = 'upper left', bbox_to_anchor = (1,1), frameon = False)
-
-plt.xlim(2022,2041)
-plt.ylim(0,6*10**7)
-plt.ylabel('MWh generated')
-plt.xlabel('Year')
\ No newline at end of file
+NATGAS_FUELS = {
+    'Natural Gas Combined-Cycle': 'ratio CC',
+    'Cogeneration': 'ratio Cogen',
+    'Natural Gas Simple-Cycle': 'ratio SC',
+}
+
+def parse_values(values: pd.Series) -> pd.Series:
+    """
+    Parse the accounting-formatted ' Value ' column in one pass:
+    ' 11,772,222 ' -> 11772222, ' (159)' -> -159, ' -   ' -> 0, blank -> NaN.
+    """
+    v = values.astype("string").str.strip().str.replace(",", "", regex=False)
+    v = v.str.replace(r"^\((.*)\)$", r"-\1", regex=True).replace("-", "0")
+    return pd.to_numeric(v, errors="coerce").astype(float)
+
+def load_projection_cube(path=file) -> pd.DataFrame:
+    """
+    Whole AESO.csv pivoted into a (Scenario, Fuel Type, Output) x year frame.
+    A few series appear twice in the CSV (storage/CCUS generation); the first occurrence wins.
+    """
+    raw = pd.read_csv(path)
+    raw['Value'] = parse_values(raw[' Value '])
+    return raw.pivot_table(index=['Scenario','Fuel Type','Output'], columns='Calendar Year',
+                           values='Value', aggfunc='first', dropna=False)
+
+def natgas_projections(cube: pd.DataFrame, scenario: str = 'Dispatchable Dominant') -> pd.DataFrame:
+    """CC / Cogen / SC generation (MWh) for one AESO scenario, with totals and ratios."""
+    gen = cube.xs((scenario, 'Generation_MWh'), level=('Scenario', 'Output'))
+    df = gen.loc[list(NATGAS_FUELS)].T.fillna(0).astype('int64')
+    df.index = df.index.astype(int)
+    df.index.name = None
+    df.columns.name = None
+    df['Total'] = df['Natural Gas Combined-Cycle'] + df['Cogeneration'] + df['Natural Gas Simple-Cycle']
+    for fuel, ratio in NATGAS_FUELS.items():
+        df[ratio] = df[fuel] / df['Total']
+    return df
+
+def natgas_ratio_by_year(projections: pd.DataFrame, years) -> pd.DataFrame:
+    """
+    CC / Cogen / SC ratios for every requested year: linear interpolation between projection
+    years, held at the first/last projected year (2022 / 2041) outside the projection window.
+    """
+    ratios = projections[list(NATGAS_FUELS.values())]
+    years = [int(y) for y in years]
+    full = ratios.reindex(sorted(set(years) | set(ratios.index)))
+    full = full.interpolate(method='index', limit_area='inside').ffill().bfill()
+    return full.loc[years]
+
+cube = load_projection_cube()
+DDprojections = natgas_projections(cube, 'Dispatchable Dominant')
+
+def plot_projections():
+    """Plot the Dispatchable Dominant natgas projections (matplotlib is only imported here)."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+
+    plt.plot(DDprojections['Total'], label = 'Total')
+    plt.plot(DDprojections['Cogeneration'], label = 'Cogeneration')
+    plt.plot(DDprojections['Natural Gas Combined-Cycle'], label = 'Combined-Cycle')
+    plt.plot(DDprojections['Natural Gas Simple-Cycle'], label = 'Simple-Cycle')
+
+    ticks = plt.gca().get_xticks()
+    labels = plt.gca().get_xticklabels()
+    plt.gca().set_xticks(ticks[::2])
+    plt.gca().set_xticklabels(labels[::2])
+
+    plt.legend(loc = 'upper left', bbox_to_anchor = (1,1), frameon = False)
+
+    plt.xlim(2022,2041)
+    plt.ylim(0,6*10**7)
+    plt.ylabel('MWh generated')
+    plt.xlabel('Year')
+    return fig
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    plot_projections()
+    plt.show()
@@ -1,80 +1,79 @@
+import numpy as np
 import pandas as pd
-# === CANGRID path resolver (cross‑platform) ===
-from pathlib import Path
-import os
+from cache_utils import data_dir
 
-def _guess_data_dir() -> Path:
-    here = Path(__file__).resolve().parent
-    candidates = [
-        here / "data",
-        here.parent / "data",
-        Path.cwd() / "data",
-        Path(os.getenv("CANGRID_DATA_DIR", "")).expanduser() if os.getenv("CANGRID_DATA_DIR") else None,
-    ]
-    tried = []
-    for d in candidates:
-        if d:
-            tried.append(str(d))
-            if d.exists():
-                return d
-    raise FileNotFoundError(
-        "Could not find a 'data' directory.\n"
-        f"Tried: {tried}\n"
-        f"Current working directory: {Path.cwd()}\n"
-        f"Script location: {here}"
-    )
-
-DATA_DIR = _guess_data_dir()
+DATA_DIR = data_dir()
 
 
 filepath = DATA_DIR / "IESO-Active-Contracted-Generation-List.csv"
 #see the file to see source, but it is from their website: https://www.ieso.ca/en/Sector-Participants/Resource-Acquisition-and-Contracts/Contract-Data-and-Reports
 
-Data_Raw = pd.read_csv(filepath)
-Breakdown = pd.DataFrame()
-Data_Raw_Excluded = Data_Raw
-
 fueltypes = ['Biomass','Natural Gas','Solar','Uranium','Waterpower','Wind','By Product Gas']
-for i in range(len(fueltypes)):
-    for j in range(len(Data_Raw)):
-        if Data_Raw['Fuel Type'][j] == fueltypes[i]:
-            Breakdown = pd.concat([Breakdown, Data_Raw.loc[[j]]], ignore_index = True)
-            Data_Raw_Excluded = Data_Raw_Excluded.drop(index = j)
-Breakdown = Breakdown.drop(columns = ['Contract Type','Supplier Legal Name','Contract Status','Contract Term (Yrs)','Milestone Commercial Operation Date',
-                                      'Term Start Date','Term End Date','Fuel Group','Connection Type','Closest City/Town','Upper Municipality','IESO Zone','Regional Planning Zone'])
-total_capacity = sum(Data_Raw['Contract Capacity (MW)'])
-Breakdown_capacity = sum(Breakdown['Contract Capacity (MW)'])
-# print(str((total_capacity - Breakdown_capacity)/total_capacity*100)+'% of total MW Contract Capacity Included')
-
-###IESO_natgas_breakdown
-SC = []
-CC = []
-CO = []
-
-filtered_rows = Breakdown[
-    (Breakdown['Fuel Type'] == 'Natural Gas') & (Breakdown['Technology'].isin(['Rankine Cycle','Simple Cycle','Simple Cycle CHP']))
-    ]
-SC = filtered_rows['Contract Capacity (MW)'].tolist()
+dropped_columns = ['Contract Type','Supplier Legal Name','Contract Status','Contract Term (Yrs)','Milestone Commercial Operation Date',
+                   'Term Start Date','Term End Date','Fuel Group','Connection Type','Closest City/Town','Upper Municipality','IESO Zone','Regional Planning Zone']
 
-filtered_rows = Breakdown[
-    (Breakdown['Fuel Type'] == 'Natural Gas') & (Breakdown['Technology'].isin(['Combined Cycle','Combined Cycle CHP']))
-    ]
-CC = filtered_rows['Contract Capacity (MW)'].tolist()
-
-filtered_rows = Breakdown[
-    (Breakdown['Fuel Type'] == 'Natural Gas') & (Breakdown['Technology'].isin(['Combined Heat and Power']))
-    ]
-CO = filtered_rows['Contract Capacity (MW)'].tolist()
+# Technology -> natgas class
+technology_class = {
+    'Rankine Cycle': 'SC', 'Simple Cycle': 'SC', 'Simple Cycle CHP': 'SC',
+    'Combined Cycle': 'CC', 'Combined Cycle CHP': 'CC',
+    'Combined Heat and Power': 'CO',
+}
 
 #capacity factors (assuming all gas turbines if not CC, which should be correcct): https://www.eia.gov/electricity/monthly/epm_table_grapher.php?t=epmt_6_07_a
 CC_cf = 0.141
 CO_cf = 0.588
 SC_cf = CC_cf
 
-total_natgas = int(sum(SC)*SC_cf) + int(sum(CC)*CC_cf) + int(sum(CO)*CO_cf)
+CAPACITY = 'Contract Capacity (MW)'
+
+def _aggregate(df: pd.DataFrame) -> pd.Series:
+    """Capacity summed by (Fuel Type, Class) for the rows of one frame/chunk."""
+    kept = df[df['Fuel Type'].isin(fueltypes)]
+    cls = kept['Technology'].map(technology_class).fillna('')
+    return kept.groupby([kept['Fuel Type'], cls.rename('Class')])[CAPACITY].sum()
 
-IESO_natgas_breakdown = pd.Series([
-    round(sum(SC)*SC_cf/total_natgas,3),
-    round(sum(CC)*CC_cf/total_natgas,3),
-    round(sum(CO)*CO_cf/total_natgas,3)
-    ], index = ['SC','CC','CO'])
\ No newline at end of file
+def aggregate_contracts(path=filepath, chunksize: int | None = None) -> tuple[pd.Series, float]:
+    """
+    Contract capacity (MW) by (Fuel Type, Class) for the tracked fuel types, plus the total
+    capacity of every row. With chunksize set, the CSV is streamed and only the three needed
+    columns are held in memory, so multi-ISO / full-province registries stay bounded.
+    """
+    usecols = [CAPACITY, 'Technology', 'Fuel Type']
+    if chunksize is None:
+        df = pd.read_csv(path, usecols=usecols)
+        return _aggregate(df), float(df[CAPACITY].sum())
+
+    parts, total = [], 0.0
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+        parts.append(_aggregate(chunk))
+        total += float(chunk[CAPACITY].sum())
+    capacity = pd.concat(parts).groupby(level=[0, 1]).sum() if parts else pd.Series(dtype=float)
+    return capacity, total
+
+def natgas_breakdown_from_capacity(capacity: pd.Series) -> pd.Series:
+    """CF-weighted SC/CC/CO shares of natural gas generation, rounded like the original script."""
+    ng = capacity.get('Natural Gas', pd.Series(dtype=float))
+    SC, CC, CO = (float(ng.get(c, 0.0)) for c in ('SC', 'CC', 'CO'))
+    total_natgas = int(SC*SC_cf) + int(CC*CC_cf) + int(CO*CO_cf)
+    return pd.Series([
+        round(SC*SC_cf/total_natgas,3),
+        round(CC*CC_cf/total_natgas,3),
+        round(CO*CO_cf/total_natgas,3)
+        ], index = ['SC','CC','CO'])
+
+def load_breakdown(path=filepath) -> pd.DataFrame:
+    """The full contract rows of the tracked fuel types (grouped by fueltypes, file order within each)."""
+    data_raw = pd.read_csv(path)
+    in_fueltypes = data_raw['Fuel Type'].isin(fueltypes)
+    order = pd.Categorical(data_raw.loc[in_fueltypes, 'Fuel Type'], categories=fueltypes).codes
+    breakdown = data_raw[in_fueltypes].iloc[np.argsort(order, kind='stable')].reset_index(drop=True)
+    return breakdown.drop(columns = dropped_columns)
+
+# Module-level results come from the streamed aggregate; load_breakdown() gives the rows themselves
+CHUNKSIZE = 50_000
+contract_capacity, total_capacity = aggregate_contracts(chunksize=CHUNKSIZE)
+Breakdown_capacity = contract_capacity.sum()
+# print(str((total_capacity - Breakdown_capacity)/total_capacity*100)+'% of total MW Contract Capacity Included')
+
+###IESO_natgas_breakdown
+IESO_natgas_breakdown = natgas_breakdown_from_capacity(contract_capacity)
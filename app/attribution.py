@@ -0,0 +1,88 @@
+# app/attribution.py
+"""
+Scenario delta attribution for grid intensity.
+
+Intensity is I = sum_k s_k * f_k over sources k (s: share of generation, f: total
+kgCO2e/kWh factor). The change between a baseline and a comparison run is split per
+source into a mix effect (shares) and a factor effect (emission factors) with the additive
+LMDI-I decomposition:
+
+    mix_k    = L(I1_k, I0_k) * ln(s1_k / s0_k)
+    factor_k = L(I1_k, I0_k) * ln(f1_k / f0_k)       L(a, b) = (a - b) / (ln a - ln b)
+
+which sums exactly to I1 - I0. Sources that are absent in one run (zero share) put their
+whole change into the mix effect, the analytical limit of LMDI as the share goes to zero.
+Everything is evaluated over all sectors x years (and any leading batch axes) at once.
+
+Either run can be any compute_arrays result in the same input unit: another scenario, GWP
+preset or factor set, or a workbook of the user's own (compute_arrays(path, ...)). The app
+offers baselines of any scenario x GWP preset x factor set.
+"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+from grid_core import NEW_INDEX, SECTORS, YEARS
+
+EFFECTS = ["Mix", "Factor"]
+
+def _log_mean(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Logarithmic mean L(a, b) for positive a, b; L(a, a) = a."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (a - b) / (np.log(a) - np.log(b))
+    return np.where(np.isclose(a, b, rtol=1e-12, atol=0.0), a, out)
+
+def lmdi(share0, factor0, share1, factor1) -> dict[str, np.ndarray]:
+    """
+    Per-source mix and factor effects, shaped like the broadcast inputs (..., source).
+    Returns 'mix', 'factor' and the per-source intensity change 'delta' (mix + factor).
+    """
+    share0, factor0, share1, factor1 = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (share0, factor0, share1, factor1)))
+    i0 = share0 * factor0
+    i1 = share1 * factor1
+    delta = i1 - i0
+    both = (i0 > 0) & (i1 > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = _log_mean(np.where(both, i1, 1.0), np.where(both, i0, 1.0))
+        mix = np.where(both, w * np.log(np.where(both, share1 / share0, 1.0)), 0.0)
+        factor = np.where(both, w * np.log(np.where(both, factor1 / factor0, 1.0)), 0.0)
+    # a term vanishes in one run: a zero share is a mix change, a zero factor a factor change
+    share_gone = (share0 <= 0) | (share1 <= 0)
+    mix = np.where(~both & share_gone, delta, mix)
+    factor = np.where(~both & ~share_gone, delta, factor)
+    return {"mix": mix, "factor": factor, "delta": delta}
+
+def intensity_attribution(base: dict[str, np.ndarray], other: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    Decompose other - base intensity for two compute_arrays / compute_scenarios results
+    (leading scenario axes broadcast, e.g. one baseline against a stack of scenarios). The
+    runs may differ in workbook, GWP and factor set but must share the emission input unit.
+
+    Returns 'mix', 'factor' (..., sector, year, source), 'delta' (..., sector, year) and
+    the two intensities 'base' and 'other'.
+    """
+    eff = lmdi(base["share"], base["total_factor"], other["share"], other["total_factor"])
+    return {
+        "mix": eff["mix"],
+        "factor": eff["factor"],
+        "delta": eff["delta"].sum(axis=-1),
+        "base": base["intensity"],
+        "other": other["intensity"],
+    }
+
+def attribution_long(attr: dict[str, np.ndarray], regions, years=None, scale: float = 1.0,
+                     value_name: str = "kgCO2e/kWh") -> pd.DataFrame:
+    """Region/Year/Source/Effect rows of a single-pair intensity_attribution result."""
+    s_idx = np.array([SECTORS.index(r) for r in regions])
+    y_idx = np.array([YEARS.index(str(y)) for y in (YEARS if years is None else years)])
+    effects = np.stack([attr["mix"], attr["factor"]])[:, s_idx][:, :, y_idx]   # (E, R, Y, K)
+    n_e, n_r, n_y, n_k = effects.shape
+    idx = np.indices(effects.shape).reshape(4, -1)
+    return pd.DataFrame({
+        "Region": pd.Categorical(np.asarray(regions)[idx[1]], categories=list(regions)),
+        "Year": np.asarray(YEARS)[y_idx][idx[2]],
+        "Source": pd.Categorical.from_codes(idx[3], NEW_INDEX),
+        "Effect": pd.Categorical.from_codes(idx[0], EFFECTS),
+        value_name: effects.ravel() * scale,
+    })
@@ -0,0 +1,128 @@
+# app/batch_export.py
+"""
+Headless export of the full result cube.
+
+Runs the model for every scenario x GWP preset in a process pool and writes, per run,
+the intensity, energy mix, CO2e contribution/share and operating-vs-embodied tables for
+all regions and years, as hive-partitioned Parquet (<out>/parquet/<table>/scenario=.../gwp=...)
+and CSV (<out>/csv/<table>/<scenario>__<gwp>.csv).
+
+    python app/batch_export.py --out exports
+    python app/batch_export.py --out exports --scenarios "2023 Current" --gwp AR6 --format csv
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from grid_core import (
+    DEFAULT_FACTOR_SET, GWP_PRESETS, NEW_INDEX, SECTORS, YEARS, compute_arrays, discover_factor_sets, scenario_path,
+    scenarios,
+)
+
+TABLES = ["intensity", "energy_mix", "co2e", "emissions_split"]
+
+def tables_from_arrays(arrays: dict[str, np.ndarray], emission_input_unit: str = "kg") -> dict[str, pd.DataFrame]:
+    """
+    Long-form Region/Year(/Source) tables for every sector and year of one model run; the
+    CO2 columns are labelled in the run's emission input unit (kg or g).
+    """
+    mass = "g" if emission_input_unit.strip().lower().startswith("g") else "kg"
+    n_s, n_y, n_k = arrays["generation"].shape
+    region = np.repeat(SECTORS, n_y)
+    year = np.tile(np.array(YEARS, dtype=int), n_s)
+    intensity = pd.DataFrame({"Region": region, "Year": year, f"{mass}CO2/kWh": arrays["intensity"].ravel()})
+
+    by_source = {
+        "Region": np.repeat(SECTORS, n_y * n_k),
+        "Year": np.tile(np.repeat(np.array(YEARS, dtype=int), n_k), n_s),
+        "Source": np.tile(NEW_INDEX, n_s * n_y),
+    }
+    embodied = np.broadcast_to(arrays["embodied"][:, None, :], (n_s, n_y, n_k))
+    return {
+        "intensity": intensity,
+        "energy_mix": pd.DataFrame({
+            **by_source,
+            "TWh": arrays["generation"].ravel() / 1e9,
+            "% of electricity": arrays["share"].ravel() * 100,
+        }),
+        "co2e": pd.DataFrame({
+            **by_source,
+            f"Total {mass}CO2": arrays["co2e"].ravel(),
+            "% of CO2": arrays["co2e_share"].ravel() * 100,
+            "Grid_Intensity_Contribution": arrays["contribution"].ravel(),
+        }),
+        "emissions_split": pd.DataFrame({
+            **by_source,
+            f"Operating {mass}CO2/kWh": arrays["operating"].ravel(),
+            f"Embodied {mass}CO2/kWh": embodied.ravel(),
+            f"Total {mass}CO2/kWh": arrays["total_factor"].ravel(),
+        }),
+    }
+
+def _slug(text: str) -> str:
+    return text.replace(" ", "_")
+
+def export_run(scenario: str, gwp_name: str, gwp: dict, out_dir: Path, formats: tuple[str, ...],
+               ef_unit: str = "kg", factor_set: str = DEFAULT_FACTOR_SET) -> tuple[str, str, int]:
+    """Compute one scenario/GWP run and write its tables; returns (scenario, gwp_name, rows written)."""
+    arrays = compute_arrays(scenario_path(scenario), gwp, ef_unit, factor_set=factor_set)
+    rows = 0
+    for name, df in tables_from_arrays(arrays, ef_unit).items():
+        rows += len(df)
+        if "parquet" in formats:
+            part = out_dir / "parquet" / name / f"scenario={_slug(scenario)}" / f"gwp={gwp_name}"
+            part.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(part / "part-0.parquet", index=False)
+        if "csv" in formats:
+            d = out_dir / "csv" / name
+            d.mkdir(parents=True, exist_ok=True)
+            df.assign(Scenario=scenario, GWP=gwp_name).to_csv(d / f"{_slug(scenario)}__{gwp_name}.csv", index=False)
+    return scenario, gwp_name, rows
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        try:
+            import fastparquet  # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Export every scenario x GWP preset table as Parquet/CSV.")
+    ap.add_argument("--out", type=Path, default=Path("exports"), help="output directory (default: exports)")
+    ap.add_argument("--scenarios", nargs="+", default=scenarios(), choices=scenarios(), metavar="SCENARIO")
+    ap.add_argument("--gwp", nargs="+", default=list(GWP_PRESETS), choices=list(GWP_PRESETS))
+    ap.add_argument("--unit", default="kg", choices=["kg", "g"], help="model input unit for emission factors")
+    ap.add_argument("--factor-set", default=DEFAULT_FACTOR_SET, choices=list(discover_factor_sets()),
+                    help=f"emission-factor set under data/factor_sets/ (default: {DEFAULT_FACTOR_SET})")
+    ap.add_argument("--format", nargs="+", default=["parquet", "csv"], choices=["parquet", "csv"], dest="formats")
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    args = ap.parse_args(argv)
+
+    formats = tuple(args.formats)
+    if "parquet" in formats and not _parquet_available():
+        print("pyarrow/fastparquet not installed; writing CSV only.", file=sys.stderr)
+        formats = tuple(f for f in formats if f != "parquet")
+        if not formats:
+            return 1
+
+    jobs = [(sc, g) for sc in args.scenarios for g in args.gwp]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(export_run, sc, g, GWP_PRESETS[g], args.out, formats, args.unit, args.factor_set) for sc, g in jobs]
+        for done, fut in enumerate(as_completed(futures), 1):
+            sc, g, rows = fut.result()
+            print(f"[{done}/{len(jobs)}] {sc} / {g}: {rows:,} rows ({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+    print(f"Wrote {len(jobs)} runs x {len(TABLES)} tables to {args.out} ({', '.join(formats)})", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
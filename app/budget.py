@@ -0,0 +1,54 @@
+# app/budget.py
+"""
+Absolute and cumulative emissions, and carbon-budget exhaustion.
+
+Annual CO2e per region and source is kWh x total factor (the 'co2e' array of a
+compute_arrays / compute_scenarios result). Cumulative emissions are prefix sums over the
+year axis, so the total over any window [start, end] is one subtraction, and the year a
+budget is used up is a comparison against the prefix sums. Both work on any leading
+batch axes (all scenarios x regions at once) and for many budgets in one call, which is
+cheap enough to rerun on every move of a budget slider.
+"""
+from __future__ import annotations
+import numpy as np
+
+from grid_core import YEARS
+
+# model mass unit (the emission input unit) -> tonnes
+TONNES_PER_UNIT = {"kg": 1e-3, "g": 1e-6}
+
+def annual_emissions(arrays: dict[str, np.ndarray], emission_input_unit: str = "kg") -> dict[str, np.ndarray]:
+    """Annual tonnes CO2e: 'by_source' (..., sector, year, source) and 'total' (..., sector, year)."""
+    by_source = arrays["co2e"] * TONNES_PER_UNIT[emission_input_unit]
+    return {"by_source": by_source, "total": by_source.sum(axis=-1)}
+
+def cumulative(annual: np.ndarray, year_axis: int = -1, start_year: int | str | None = None) -> np.ndarray:
+    """
+    Running totals from start_year (default the first model year) along year_axis; years
+    before start_year are 0. Computed from one prefix sum over the full horizon.
+    """
+    cum = np.cumsum(annual, axis=year_axis)
+    if start_year is None or str(start_year) == YEARS[0]:
+        return cum
+    i = YEARS.index(str(start_year))
+    before = np.take(cum, [i - 1], axis=year_axis)
+    out = cum - before
+    idx = [slice(None)] * out.ndim
+    idx[year_axis] = slice(0, i)
+    out[tuple(idx)] = 0.0
+    return out
+
+def exhaustion_year(cum_total: np.ndarray, budgets, start_year: int | str | None = None) -> np.ndarray:
+    """
+    First model year from start_year (default the first model year) whose cumulative total
+    (..., year) reaches each budget (same unit); a budget <= 0 is used up in start_year.
+    Returns shape budgets.shape + cum_total.shape[:-1]; NaN where the budget lasts past
+    the last model year.
+    """
+    budgets = np.asarray(budgets, dtype=float)
+    reached = cum_total >= budgets.reshape(budgets.shape + (1,) * cum_total.ndim)
+    if start_year is not None:
+        reached[..., :YEARS.index(str(start_year))] = False
+    first = reached.argmax(axis=-1)
+    years = np.asarray(YEARS, dtype=float)[first]
+    return np.where(reached.any(axis=-1), years, np.nan)
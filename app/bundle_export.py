@@ -0,0 +1,102 @@
+# app/bundle_export.py
+"""
+"Everything for this selection" bundles for the dashboard: every result table for the
+chosen scenarios and regions as a zip of CSVs, a zip of Parquet files (offered only when
+pyarrow or fastparquet is installed) or a multi-sheet Excel workbook.
+
+Bundles are written to disk one scenario at a time (each scenario's tables are built,
+appended and dropped before the next), so a full 5-scenario x 14-region bundle never
+sits in memory at once. write_bundle is free of Streamlit and safe to run in a worker
+thread; the app does so and polls the progress callback.
+"""
+from __future__ import annotations
+import io
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable
+
+from batch_export import TABLES, _parquet_available, _slug, tables_from_arrays
+from cache_utils import atomic_write, cache_dir
+from grid_core import AESO_SCENARIO, DEFAULT_FACTOR_SET, compute_arrays, scenario_path
+
+# format -> (file extension, MIME type, label)
+FORMATS = {
+    "zip-csv": ("zip", "application/zip", "ZIP of CSV files"),
+    "zip-parquet": ("zip", "application/zip", "ZIP of Parquet files (large pulls)"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "Excel workbook (one sheet per table)"),
+}
+if not _parquet_available():  # no pyarrow/fastparquet: only offer what can be written
+    del FORMATS["zip-parquet"]
+CSV_CHUNK_ROWS = 10_000
+
+def iter_tables(scenarios, regions, gwp: dict, emission_input_unit: str = "kg",
+                aeso_scenario: str = AESO_SCENARIO, factor_set: str = DEFAULT_FACTOR_SET):
+    """Yield (scenario, table name, frame) one scenario at a time; regions=None keeps all."""
+    for sc in scenarios:
+        arrays = compute_arrays(scenario_path(sc), gwp, emission_input_unit, aeso_scenario, factor_set)
+        for name, df in tables_from_arrays(arrays, emission_input_unit).items():
+            if regions is not None:
+                df = df[df["Region"].isin(list(regions))]
+            df.insert(0, "Scenario", sc)
+            yield sc, name, df
+
+def _write_zip(tmp: Path, tables, parquet: bool, progress) -> None:
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for sc, name, df in tables:
+            if parquet:
+                with zf.open(f"{name}/scenario={_slug(sc)}/part-0.parquet", "w") as f:
+                    df.to_parquet(f, index=False)
+            else:
+                with zf.open(f"{name}/{_slug(sc)}.csv", "w") as raw, \
+                        io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+                    df.to_csv(f, index=False, chunksize=CSV_CHUNK_ROWS)
+            progress()
+
+def _write_xlsx(tmp: Path, tables, progress) -> None:
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)   # rows stream to per-sheet temp files
+    sheets = {}
+    for _, name, df in tables:
+        if name not in sheets:
+            sheets[name] = wb.create_sheet(name)
+            sheets[name].append(list(df.columns))
+        for row in df.itertuples(index=False, name=None):
+            sheets[name].append(row)
+        progress()
+    wb.save(tmp)
+
+def write_bundle(path: Path, fmt: str, scenarios, regions, gwp: dict, emission_input_unit: str = "kg",
+                 aeso_scenario: str = AESO_SCENARIO, progress: Callable[[int, int], None] | None = None,
+                 factor_set: str = DEFAULT_FACTOR_SET) -> Path:
+    """
+    Write every table for scenarios x regions to `path` in `fmt` (a FORMATS key). The file
+    only appears once complete. progress(done, total) is called after each scenario table.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown bundle format {fmt!r}; expected one of {list(FORMATS)}")
+    total = len(scenarios) * len(TABLES)
+    done = 0
+
+    def _step():
+        nonlocal done
+        done += 1
+        if progress:
+            progress(done, total)
+
+    tables = iter_tables(scenarios, regions, gwp, emission_input_unit, aeso_scenario, factor_set)
+    if fmt == "xlsx":
+        return atomic_write(path, lambda tmp: _write_xlsx(tmp, tables, _step))
+    return atomic_write(path, lambda tmp: _write_zip(tmp, tables, fmt == "zip-parquet", _step))
+
+def bundle_path(fmt: str, max_age_s: float = 24 * 3600) -> Path:
+    """A fresh output path under .cache/bundles; bundles older than max_age_s are removed."""
+    d = cache_dir("bundles")
+    now = time.time()
+    for old in d.glob("bundle-*"):
+        try:
+            if now - old.stat().st_mtime > max_age_s:
+                old.unlink()
+        except FileNotFoundError:
+            pass
+    return d / f"bundle-{time.strftime('%Y%m%dT%H%M%S')}-{time.perf_counter_ns() % 10**6:06d}.{FORMATS[fmt][0]}"
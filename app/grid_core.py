@@ -1,44 +1,223 @@
 # app/grid_core.py
 from __future__ import annotations
+import hashlib
+import json
+import os
+import warnings
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import sys
 
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from specific_breakdowns import (
-    hydro_breakdown, coal_breakdown, natgas_breakdown, oil_breakdown,
-    solar_breakdown, wind_breakdown
-)
-from AESO_Data_Extract import DDprojections
-from IESO_Data_Extract import IESO_natgas_breakdown
+from breakdown_params import get_params
+from cache_utils import atomic_write, cache_dir, file_digest
+from instrument import record_cache, span, timed_call
 
 SECTORS = ['Canada','AB','BC','MB','NB','NL','NT','NS','NU','ON','PE','QC','SK','YT']
+YEARS = [str(y) for y in range(2005, 2051)]
+# ---------- Scenario workbooks ----------
+# Every .xlsx in data/ is a scenario, named after its file: "Electricity_Generation_2023_Current.xlsx"
+# -> "2023 Current". New CER releases dropped into data/ are picked up by refresh_scenarios().
+DATA_DIR = ROOT / "data"
+SCENARIO_FILE_PREFIX = "Electricity_Generation_"
+
+def scenario_name(xlsx_path: Path) -> str:
+    stem = Path(xlsx_path).stem
+    return stem.removeprefix(SCENARIO_FILE_PREFIX).replace("_", " ").strip()
+
+def discover_scenarios(data_dir: Path = DATA_DIR) -> dict[str, str]:
+    """
+    Scenario name -> workbook file name for every .xlsx in data_dir that workbook_index can
+    read (Excel lock files skipped). Other workbooks are skipped with a warning.
+    """
+    found = {}
+    for p in sorted((p for p in Path(data_dir).glob("*.xlsx") if not p.name.startswith("~$")), key=scenario_name):
+        st = p.stat()
+        error = _workbook_error(str(p.resolve()), st.st_mtime_ns, st.st_size)
+        if error:
+            warnings.warn(f"Skipping {p.name}: not a scenario workbook ({error})", stacklevel=2)
+            continue
+        found[scenario_name(p)] = p.name
+    return found
+
+# ---------- GWP presets (100-year) ----------
+GWP_AR5 = {"CO2": 1.0, "CH4": 28.0,  "N2O": 265.0, "SF6": 23500.0}
+GWP_AR6 = {"CO2": 1.0, "CH4": 27.2,  "N2O": 273.0, "SF6": 25200.0}
+GWP_PRESETS = {"AR6": GWP_AR6, "AR5": GWP_AR5}
+
+# AESO scenario whose per-year natgas split is used for AB
+AESO_SCENARIO = 'Dispatchable Dominant'
 NEW_INDEX = ['Hydro / Wave / Tidal','Wind','Biomass / Geothermal','Solar','Uranium','Coal & Coke','Natural Gas','Oil']
 
-def load_total_grid(xlsx_path: Path) -> list[pd.DataFrame]:
-    Total_Grid = pd.read_excel(xlsx_path)
-    for col in Total_Grid.columns:
-        Total_Grid[col] = Total_Grid[col].fillna(0)
+# Block headings in the CER sheets; each is followed by a "_ | 2005 | 2006 ..." year row and
+# one row per source. Sector codes are accepted as headings too.
+REGION_LABELS = {
+    "Canada": "Canada", "Newfoundland and Labrador": "NL", "Prince Edward Island": "PE",
+    "Nova Scotia": "NS", "New Brunswick": "NB", "Quebec": "QC", "Québec": "QC", "Ontario": "ON",
+    "Manitoba": "MB", "Alberta": "AB", "British Columbia": "BC", "Saskatchewan": "SK",
+    "Yukon": "YT", "Northwest Territories": "NT", "Nunavut": "NU",
+    **{s: s for s in SECTORS},
+}
+# Bump when the layout of the cached workbook index changes
+INDEX_VERSION = 2
 
-    slices = {
-        "Canada": (7, 15), "AB": (95, 103), "BC": (106, 114), "MB": (84, 92),
-        "NB": (51, 59), "NL": (18, 26), "NT": (139, 147), "NS": (40, 48),
-        "NU": (150, 158), "ON": (73, 81), "PE": (29, 37), "QC": (62, 70),
-        "SK": (117, 125), "YT": (128, 136),
-    }
-    years = [str(y) for y in range(2005, 2051)]
+def _scan_workbook(xlsx_path: Path) -> dict:
+    """One streaming pass over the first sheet, locating each sector's source rows and year columns."""
+    from openpyxl import load_workbook
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        index, sector = {}, None
+        for r, row in enumerate(wb.worksheets[0].iter_rows(values_only=True), start=1):
+            label = str(row[0]).strip() if row and row[0] is not None else ""
+            if label in REGION_LABELS:
+                sector = REGION_LABELS[label]
+                index[sector] = {"rows": [None] * len(NEW_INDEX), "cols": None}
+            elif sector is not None and index[sector]["cols"] is None:
+                heads = [str(v).strip().removesuffix(".0") if v is not None else "" for v in row]
+                if set(YEARS) <= set(heads):
+                    index[sector]["cols"] = [heads.index(y) + 1 for y in YEARS]
+            elif sector is not None and label in NEW_INDEX:
+                index[sector]["rows"][NEW_INDEX.index(label)] = r
+    finally:
+        wb.close()
+    missing = [s for s in SECTORS if s not in index or index[s]["cols"] is None]
+    if missing:
+        raise ValueError(f"{Path(xlsx_path).name}: no block (heading + {YEARS[0]}-{YEARS[-1]} year row) "
+                         f"for {', '.join(missing)}")
+    missing = {s: [k for k, r in zip(NEW_INDEX, index[s]["rows"]) if r is None] for s in SECTORS}
+    missing = {s: ks for s, ks in missing.items() if ks}
+    if missing:
+        raise ValueError(f"{Path(xlsx_path).name}: missing source rows "
+                         + "; ".join(f"{s}: {', '.join(ks)}" for s, ks in missing.items()))
+    return {s: index[s] for s in SECTORS}
+
+def workbook_index(xlsx_path: Path) -> dict:
+    """
+    {sector: {'rows': sheet row per NEW_INDEX source, 'cols': sheet column
+    per YEARS}} for a scenario workbook, found from its labels rather than fixed offsets.
+    Cached as JSON under cache_dir('workbooks'), keyed by the xlsx content hash.
+    """
+    xlsx_path = Path(xlsx_path)
+    cached = cache_dir("workbooks") / f"{xlsx_path.stem}-{file_digest(xlsx_path)[:16]}-index-v{INDEX_VERSION}.json"
+    if cached.exists():
+        return json.loads(cached.read_text())
+    with span("workbook:index"):
+        index = _scan_workbook(xlsx_path)
+    atomic_write(cached, lambda tmp: tmp.write_text(json.dumps(index)))
+    return index
+
+@lru_cache(maxsize=64)
+def _workbook_error(path: str, mtime_ns: int, size: int) -> str | None:
+    """Why workbook_index cannot read the workbook, or None; checked once per file version."""
+    try:
+        workbook_index(Path(path))
+    except Exception as e:  # unreadable, or not a CER generation workbook
+        return str(e) or type(e).__name__
+    return None
+
+@lru_cache(maxsize=1)
+def _scenario_files() -> tuple[tuple[str, str], ...]:
+    return tuple(discover_scenarios().items())
+
+def scenario_files() -> dict[str, str]:
+    """Scenario name -> workbook file name in data/, discovered on first use and kept until refresh_scenarios()."""
+    return dict(_scenario_files())
+
+def scenarios() -> list[str]:
+    """Scenario names in discovery order (see scenario_files)."""
+    return [name for name, _ in _scenario_files()]
+
+def scenario_path(scenario: str) -> Path:
+    """Workbook path of a discovered scenario."""
+    files = scenario_files()
+    if scenario not in files:
+        raise KeyError(f"Unknown scenario {scenario!r}; available: {', '.join(files) or 'none'}")
+    return DATA_DIR / files[scenario]
+
+def refresh_scenarios() -> list[str]:
+    """
+    Re-scan data/ so scenarios() / scenario_files() pick up added or removed workbooks.
+    Returns the scenarios added since the previous scan (none on the first scan).
+    """
+    known = scenarios() if _scenario_files.cache_info().currsize else None
+    _scenario_files.cache_clear()
+    return [sc for sc in scenarios() if known is not None and sc not in known]
+
+def _parse_workbook(xlsx_path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Read only the indexed cells: one streaming pass over the rows/columns the index spans."""
+    from openpyxl import load_workbook
+    index = workbook_index(xlsx_path)
+    wanted = {}                                              # sheet row -> (sector, source) positions
+    for i, s in enumerate(SECTORS):
+        for k, r in enumerate(index[s]["rows"]):
+            wanted.setdefault(r, []).append((i, k))
+    values = np.zeros((len(SECTORS), len(NEW_INDEX), len(YEARS)))
+    if wanted:
+        max_col = max(max(index[s]["cols"]) for s in SECTORS)
+        wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(min_row=min(wanted), max_row=max(wanted), max_col=max_col, values_only=True)
+            for r, row in enumerate(rows, start=min(wanted)):
+                for i, k in wanted.get(r, ()):
+                    cells = [row[c - 1] if c - 1 < len(row) else None for c in index[SECTORS[i]]["cols"]]
+                    values[i, k] = [0.0 if v is None or v == "" else float(v) for v in cells]
+        finally:
+            wb.close()
+    labels = np.array([NEW_INDEX] * len(SECTORS), dtype=str)
+    return labels, values
+
+def _workbook_cache_path(xlsx_path: Path) -> Path:
+    return cache_dir("workbooks") / f"{xlsx_path.stem}-{file_digest(xlsx_path)[:16]}.npz"
+
+def load_grid_arrays(xlsx_path: Path, use_cache: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Source labels (sector, row) and generation values in GWh (sector, row, year) for a
+    scenario workbook. Parsed sheets are cached as .npz under cache_dir('workbooks'),
+    keyed by the xlsx content hash, so the openpyxl parse only reruns when the file changes.
+    """
+    if not use_cache:
+        with span("workbook:parse"):
+            return _parse_workbook(xlsx_path)
+
+    xlsx_path = Path(xlsx_path)
+    cached = _workbook_cache_path(xlsx_path)
+    if cached.exists():
+        with span("workbook:npz", cache=True), np.load(cached) as z:
+            return z["labels"], z["values"]
+
+    with span("workbook:parse", cache=True):
+        record_cache(False)
+        labels, values = _parse_workbook(xlsx_path)
+    def _write(tmp: Path):
+        with open(tmp, "wb") as f:
+            np.savez(f, labels=labels, values=values)
+    atomic_write(cached, _write)
+    return labels, values
+
+def load_total_grid(xlsx_path: Path, use_cache: bool = True) -> list[pd.DataFrame]:
+    labels, values = load_grid_arrays(xlsx_path, use_cache)
     grid_list = []
-    for s in SECTORS:
-        a, b = slices[s]
-        df = Total_Grid.iloc[a:b].reset_index(drop=True).copy()
-        df.columns = [s] + years
+    for i, s in enumerate(SECTORS):
+        df = pd.DataFrame(values[i], columns=YEARS)
+        df.insert(0, s, labels[i].astype(object))
         grid_list.append(df)
     return grid_list
 
 def build_breakdown() -> dict:
+    p = get_params()
+    hydro_breakdown, coal_breakdown = p['hydro_breakdown'], p['coal_breakdown']
+    natgas_breakdown, oil_breakdown = p['natgas_breakdown'], p['oil_breakdown']
     bd = {}
     for s in SECTORS:
         bd[s] = {
@@ -58,149 +237,502 @@ def _to_kg_factor(unit_in: str) -> float:
     u = (unit_in or "kg").strip().lower()
     return 1.0 if u.startswith("kg") else 1.0*1000.0  # grams -> kg
 
+# ---------- Emission-factor sets ----------
+# Operating (technology x gas) and embodied (per source) factors are versioned files under
+# data/factor_sets/: <set>.toml holds the metadata and the embodied factors, and the operating
+# factors are either a <set>.csv next to it (technology,CO2,CH4,N2O,SF6) or [operating.<technology>]
+# tables in the TOML. Values are per kWh in the model input unit (kg, or g with
+# emission_input_unit='g'). Each set is compiled once into a dense TECHS x GASES matrix and
+# an EMBODIED_TERMS vector; the sector weights they are applied with (mixing_weights,
+# embodied_weights) do not depend on the set, so swapping sets is a matrix product.
+FACTOR_SET_DIR = DATA_DIR / "factor_sets"
+DEFAULT_FACTOR_SET = "baseline_v1"
+GASES = ['CO2', 'CH4', 'N2O', 'SF6']
+TECHS = [
+    'coal_bit', 'coal_lig', 'coal_sub', 'diesel', 'heavy', 'hydro_res', 'hydro_riv',
+    'natgas_cogen', 'natgas_comb', 'natgas_convert', 'natgas_simple', 'nuclear',
+    'solar_conc', 'solar_pv', 'wind', 'wood_cogen', 'wood_simple',
+]
+# embodied factor of each term; wind and solar are at their reference capacity factor
+EMBODIED_TERMS = ['hydro_res', 'hydro_riv', 'wind', 'biomass', 'solar', 'nuclear', 'coal', 'natgas', 'oil']
+TRANSMISSION_EFFICIENCY = 1.0
+
+def discover_factor_sets(directory: Path | None = None) -> dict[str, Path]:
+    """Factor set name (file stem) -> TOML path for every set in directory (default FACTOR_SET_DIR)."""
+    return {p.stem: p for p in sorted(Path(directory or FACTOR_SET_DIR).glob("*.toml"))}
+
+def factor_set_key(name: str = DEFAULT_FACTOR_SET) -> tuple:
+    """
+    (name, file keys of the set's TOML and CSV); changes whenever either file does. Only
+    names discover_factor_sets() lists are accepted (KeyError otherwise), never paths.
+    """
+    sets = discover_factor_sets()
+    if name not in sets:
+        raise KeyError(f"Unknown factor set {name!r}; available: {', '.join(sets) or 'none'}")
+    path = sets[name]
+    csv = path.with_suffix(".csv")
+    return name, _file_key(path), _file_key(csv) if csv.exists() else None
+
+@lru_cache(maxsize=16)
+def _compile_factor_set(set_key: tuple) -> dict:
+    name, (toml_path, _, _), csv_key = set_key
+    with open(toml_path, "rb") as f:
+        spec = tomllib.load(f)
+    if csv_key is not None:
+        operating = pd.read_csv(csv_key[0], index_col="technology")
+    else:
+        operating = pd.DataFrame.from_dict(spec.get("operating", {}), orient="index")
+    missing = [t for t in TECHS if t not in operating.index] + [g for g in GASES if g not in operating.columns]
+    unknown = [t for t in operating.index if t not in TECHS]
+    if missing or unknown:
+        raise ValueError(f"Factor set {name!r}: missing operating factors {missing}, unknown technologies {unknown}")
+
+    embodied = spec.get("embodied", {})
+    reference_cf = embodied.get("reference_cf", {})
+    missing = [t for t in EMBODIED_TERMS if t not in embodied] + [k for k in ("wind", "solar") if k not in reference_cf]
+    if missing:
+        raise ValueError(f"Factor set {name!r}: missing embodied factors {missing}")
+    # wind/solar scale with reference_cf / regional cf: fold the reference into the coefficient
+    coef = np.array([float(embodied[t]) * float(reference_cf.get(t, 1.0)) for t in EMBODIED_TERMS])
+
+    digest = hashlib.sha256("".join(file_digest(Path(k[0])) for k in set_key[1:] if k).encode()).hexdigest()
+    return {
+        "name": name,
+        "title": spec.get("name", name),
+        "version": str(spec.get("version", "")),
+        "source": spec.get("source", ""),
+        "digest": digest,
+        "proc": _frozen(operating.loc[TECHS, GASES].to_numpy(dtype=float)),   # (T, G)
+        "embodied": _frozen(coef),                                           # (EMBODIED_TERMS,)
+    }
+
+def compile_factor_set(name: str = DEFAULT_FACTOR_SET) -> dict:
+    """
+    A factor set compiled to arrays: 'proc' (TECHS x GASES operating factors), 'embodied'
+    (EMBODIED_TERMS coefficients, see embodied_basis), its 'title', 'version', 'source' and
+    a content 'digest'. Recompiled only when its files change.
+    """
+    return _compile_factor_set(factor_set_key(name))
+
+def proc_matrix(factor_set: str = DEFAULT_FACTOR_SET) -> np.ndarray:
+    """Technology x gas matrix of operating factors (kg/kWh), rows ordered as TECHS."""
+    return compile_factor_set(factor_set)["proc"]
+
+def mixing_tensor(breakdown: dict, aeso_scenario: str = AESO_SCENARIO) -> np.ndarray:
+    """
+    Sector x year x source x technology weights: how much of each technology's operating
+    factor goes into a source's factor (hydro res/riv, coal bit/sub/lig, ...). Only the
+    AB natgas split varies by year, following the AESO projections for `aeso_scenario`.
+    """
+    p = get_params()
+    ab_natgas = p['AESO_natgas_ratios'][aeso_scenario].loc[[int(y) for y in YEARS]]
+    IESO_natgas_breakdown = p['IESO_natgas_breakdown']
+    T = {t: i for i, t in enumerate(TECHS)}
+    K = {k: i for i, k in enumerate(NEW_INDEX)}
+    mix = np.zeros((len(SECTORS), len(NEW_INDEX), len(TECHS)))
+    for i, s in enumerate(SECTORS):
+        b = breakdown[s]
+        # NG split overrides
+        natgas_CC, natgas_CO, natgas_SC = b['natgas']['CC%'], b['natgas']['CO%'], b['natgas']['SC%']
+        if s == 'ON':
+            natgas_CC = IESO_natgas_breakdown['CC']
+            natgas_SC = IESO_natgas_breakdown['SC']
+            natgas_CO = IESO_natgas_breakdown['CO']
+
+        m = mix[i]
+        m[K['Hydro / Wave / Tidal'], [T['hydro_res'], T['hydro_riv']]] = b['hydro']['res%'], b['hydro']['riv%']
+        m[K['Wind'], T['wind']] = 1.0
+        m[K['Biomass / Geothermal'], [T['wood_cogen'], T['wood_simple']]] = 0.5, 0.5
+        m[K['Solar'], T['solar_pv']] = 1.0
+        m[K['Uranium'], T['nuclear']] = 1.0
+        m[K['Coal & Coke'], [T['coal_bit'], T['coal_sub'], T['coal_lig']]] = b['coal']['bit%'], b['coal']['sub%'], b['coal']['lig%']
+        m[K['Natural Gas'], [T['natgas_comb'], T['natgas_cogen'], T['natgas_simple']]] = natgas_CC, natgas_CO, natgas_SC
+        m[K['Oil'], [T['diesel'], T['heavy']]] = b['oil']['diesel%'], b['oil']['heavy%']
+
+    mix = np.repeat(mix[:, None], len(YEARS), axis=1)
+    ab = SECTORS.index('AB')
+    for tech, ratio in (('natgas_comb', 'ratio CC'), ('natgas_cogen', 'ratio Cogen'), ('natgas_simple', 'ratio SC')):
+        mix[ab, :, K['Natural Gas'], T[tech]] = ab_natgas[ratio].to_numpy()
+    return mix
+
+def embodied_basis(breakdown: dict, solar_cf=None, wind_cf=None) -> np.ndarray:
+    """
+    Sector x source x EMBODIED_TERMS weights: a factor set's embodied coefficients times
+    these give the sector x source embodied factors (hydro by the res/riv split, wind and
+    solar by 1 / capacity factor). solar_cf / wind_cf default to the solar/wind breakdown
+    capacity factors; pass arrays shaped (..., sector) to get (..., sector, source, term)
+    results for sampled values.
+    """
+    p = get_params()
+    if solar_cf is None:
+        solar_cf = p['solar_breakdown']['cf'].loc[SECTORS].to_numpy(dtype=float)
+    if wind_cf is None:
+        wind_cf = p['wind_breakdown']['cf to 5%'].loc[SECTORS].to_numpy(dtype=float)
+    solar_cf, wind_cf = np.broadcast_arrays(np.asarray(solar_cf, dtype=float), np.asarray(wind_cf, dtype=float))
+    res = np.array([breakdown[s]['hydro']['res%'] for s in SECTORS])
+    riv = np.array([breakdown[s]['hydro']['riv%'] for s in SECTORS])
+    K = {k: i for i, k in enumerate(NEW_INDEX)}
+    C = {c: i for i, c in enumerate(EMBODIED_TERMS)}
+
+    basis = np.zeros(solar_cf.shape + (len(NEW_INDEX), len(EMBODIED_TERMS)))
+    basis[..., K['Hydro / Wave / Tidal'], C['hydro_res']] = res
+    basis[..., K['Hydro / Wave / Tidal'], C['hydro_riv']] = riv
+    basis[..., K['Wind'], C['wind']] = 1.0 / wind_cf
+    basis[..., K['Biomass / Geothermal'], C['biomass']] = 1.0
+    basis[..., K['Solar'], C['solar']] = 1.0 / solar_cf
+    basis[..., K['Uranium'], C['nuclear']] = 1.0
+    basis[..., K['Coal & Coke'], C['coal']] = 1.0
+    basis[..., K['Natural Gas'], C['natgas']] = 1.0
+    basis[..., K['Oil'], C['oil']] = 1.0
+    return basis
+
+def embodied_matrix(breakdown: dict, solar_cf=None, wind_cf=None, factor_set: str = DEFAULT_FACTOR_SET) -> np.ndarray:
+    """Sector x source embodied factors (kg CO2e/kWh) of a factor set; see embodied_basis for the cf arrays."""
+    return embodied_basis(breakdown, solar_cf, wind_cf) @ compile_factor_set(factor_set)["embodied"]
+
+def generation_tensor(values: np.ndarray) -> np.ndarray:
+    """(sector, source, year) GWh from load_grid_arrays -> (sector, year, source) kWh."""
+    return values.transpose(0, 2, 1) * 1e6  # GWh -> kWh
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den, with 0 wherever den is 0 (matches the old per-frame guards)."""
+    out = np.zeros(np.broadcast_shapes(num.shape, den.shape))
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+def _gwp_matrix(gwps) -> np.ndarray:
+    """N x 4 GWP array (GASES order) from an array or a sequence of {'CO2','CH4','N2O','SF6'} dicts."""
+    if isinstance(gwps, dict):
+        gwps = [gwps]
+    if len(gwps) and isinstance(gwps[0], dict):
+        gwps = [[float(g[k]) for k in GASES] for g in gwps]
+    m = np.atleast_2d(np.asarray(gwps, dtype=float))
+    if m.shape[1] != len(GASES):
+        raise ValueError(f"GWP matrix must be N x {len(GASES)} ({', '.join(GASES)}), got {m.shape}")
+    return m
+
+# =========================
+#   STAGED PIPELINE (memoized)
+# =========================
+# ingest -> breakdown parameters -> per-gas factor tensors -> CO2e weighting -> aggregation.
+# Each stage is cached on its own inputs only, so a GWP change reruns the last two stages
+# and a kg/g or factor-set change the last three (the set-independent mixing and embodied
+# weights are kept, so that is two matrix products); the workbook is never re-read for either.
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+def _file_key(xlsx_path: Path) -> tuple[str, int, int]:
+    st = Path(xlsx_path).stat()
+    return str(Path(xlsx_path).resolve()), st.st_mtime_ns, st.st_size
+
+@lru_cache(maxsize=16)
+def _ingest(file_key: tuple[str, int, int]) -> np.ndarray:
+    return _frozen(generation_tensor(load_grid_arrays(Path(file_key[0]))[1]))
+
+def ingest_workbook(xlsx_path: Path) -> np.ndarray:
+    """Stage 1: generation (sector, year, source) in kWh for a scenario workbook."""
+    return timed_call("model:ingest", _ingest, _file_key(xlsx_path))
+
+def ingest_workbooks(xlsx_paths, workers: int | None = None) -> np.ndarray:
+    """
+    Stage 1 for several workbooks, stacked (workbook, sector, year, source). Workbooks not
+    yet in the on-disk cache are parsed in a process pool (the openpyxl parse is CPU-bound),
+    which writes their .npz; all are then loaded through ingest_workbook. workers defaults
+    to CANGRID_INGEST_WORKERS or the CPU count; 1 parses in this process.
+    """
+    paths = [Path(p) for p in xlsx_paths]
+    workers = workers or int(os.getenv("CANGRID_INGEST_WORKERS", "0")) or os.cpu_count() or 1
+    cold = [p for p in dict.fromkeys(paths) if not _workbook_cache_path(p).exists()]
+    if len(cold) > 1 and workers > 1:
+        with span("workbook:parse_pool"), ProcessPoolExecutor(max_workers=min(workers, len(cold))) as pool:
+            list(pool.map(load_grid_arrays, cold))
+    return np.stack([ingest_workbook(p) for p in paths])
+
+@lru_cache(maxsize=1)
+def breakdown_parameters() -> dict:
+    """Stage 2: per-sector hydro/coal/natgas/oil splits (build_breakdown, computed once)."""
+    return build_breakdown()
+
+@lru_cache(maxsize=4)
+def mixing_weights(aeso_scenario: str = AESO_SCENARIO) -> np.ndarray:
+    """Stage 3a: mixing_tensor (sector, year, source, technology) of the breakdown parameters."""
+    return _frozen(mixing_tensor(breakdown_parameters(), aeso_scenario))
+
+@lru_cache(maxsize=1)
+def embodied_weights() -> np.ndarray:
+    """Stage 3a: embodied_basis (sector, source, term) of the breakdown parameters."""
+    return _frozen(embodied_basis(breakdown_parameters()))
+
+@lru_cache(maxsize=16)
+def factor_tensors(emission_input_unit: str = "kg", aeso_scenario: str = AESO_SCENARIO,
+                   set_key: tuple | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stage 3: operating factors per gas (sector, year, source, gas) and embodied (sector,
+    source), kg/kWh, for the factor set with factor_set_key() set_key (None: the default set).
+    """
+    factors = _compile_factor_set(set_key or factor_set_key())
+    mass_to_kg = _to_kg_factor(emission_input_unit)
+    per_gas = mixing_weights(aeso_scenario) @ (factors["proc"] * mass_to_kg) / TRANSMISSION_EFFICIENCY
+    embodied = embodied_weights() @ factors["embodied"] * mass_to_kg
+    return _frozen(per_gas), _frozen(embodied)
+
+@lru_cache(maxsize=64)
+def co2e_factors(gwp_key: tuple[float, ...], emission_input_unit: str = "kg",
+                 aeso_scenario: str = AESO_SCENARIO, set_key: tuple | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Stage 4: operating (sector, year, source) and total factors in kg CO2e/kWh for one GWP vector (GASES order)."""
+    per_gas, embodied = factor_tensors(emission_input_unit, aeso_scenario, set_key)
+    operating = per_gas @ np.asarray(gwp_key, dtype=float)
+    return _frozen(operating), _frozen(operating + embodied[:, None, :])
+
+def aggregate(gen: np.ndarray, operating: np.ndarray, embodied: np.ndarray, total_factor: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Stage 5: shares, intensity, CO2e totals and contributions. gen may carry leading batch
+    axes (e.g. stacked scenarios); the factors broadcast against them.
+    """
+    share = _safe_div(gen, gen.sum(axis=-1, keepdims=True))
+    intensity = (share * total_factor).sum(axis=-1)                         # (..., S, Y)
+    co2e = gen * total_factor
+    co2e_share = _safe_div(co2e, co2e.sum(axis=-1, keepdims=True))
+    contribution = co2e_share * intensity[..., None]
+    return {
+        "generation": gen,
+        "operating": operating,
+        "embodied": embodied,
+        "total_factor": total_factor,
+        "share": share,
+        "intensity": intensity,
+        "co2e": co2e,
+        "co2e_share": co2e_share,
+        "contribution": contribution,
+    }
+
+def gwp_sweep(
+    xlsx_path: Path,
+    gwps,
+    emission_input_unit: str = "kg",
+    aeso_scenario: str = AESO_SCENARIO,
+    factor_set: str = DEFAULT_FACTOR_SET,
+) -> dict[str, np.ndarray]:
+    """
+    Evaluate many GWP vectors in one batch. Intensity is linear in the GWPs, so the
+    share-weighted per-gas factors are reduced once to (sector, year, gas) and every
+    GWP row is a single matrix product.
+
+    gwps: N x 4 array in GASES order (CO2, CH4, N2O, SF6), or a list of gwp dicts.
+    Returns 'gwp' (N, 4), 'intensity' kg CO2e/kWh (N, sector, year) and
+    'co2e_total' kg CO2e (N, sector, year).
+    """
+    gwp_m = _gwp_matrix(gwps)
+    gen = ingest_workbook(xlsx_path)                                        # (S, Y, K)
+    per_gas_factors, embodied = factor_tensors(emission_input_unit, aeso_scenario, factor_set_key(factor_set))
+    total_kwh = gen.sum(axis=2)
+    share = _safe_div(gen, total_kwh[:, :, None])
+    per_gas = np.einsum('syk,sykg->syg', share, per_gas_factors)
+    emb = (share * embodied[:, None, :]).sum(axis=2)                        # (S, Y)
+
+    intensity = np.einsum('syg,ng->nsy', per_gas, gwp_m) + emb
+    return {
+        "gwp": gwp_m,
+        "intensity": intensity,
+        "co2e_total": intensity * total_kwh,
+    }
+
+def compute_arrays(
+    xlsx_path: Path,
+    gwp: dict[str, float],
+    emission_input_unit: str = "kg",
+    aeso_scenario: str = AESO_SCENARIO,
+    factor_set: str = DEFAULT_FACTOR_SET,
+) -> dict[str, np.ndarray]:
+    """
+    Array engine behind compute_structures. All outputs are indexed (sector, year, source)
+    following SECTORS / YEARS / NEW_INDEX, except 'embodied' (sector, source) and
+    'intensity' (sector, year). Inputs are read-only arrays shared with the stage caches.
+    """
+    gen = ingest_workbook(xlsx_path)                                        # (S, Y, K) kWh
+    with span("model:aggregate"):
+        return aggregate(gen, *_factor_stages(gwp, emission_input_unit, aeso_scenario, factor_set))
+
+def _factor_stages(gwp, emission_input_unit, aeso_scenario, factor_set=DEFAULT_FACTOR_SET):
+    """(operating, embodied, total_factor) from the memoized factor stages."""
+    gwp_key = tuple(_gwp_matrix(gwp)[0])
+    set_key = factor_set_key(factor_set)
+    timed_call("model:breakdown", breakdown_parameters)
+    embodied = timed_call("model:factor_tensors", factor_tensors, emission_input_unit, aeso_scenario, set_key)[1]
+    operating, total_factor = timed_call("model:co2e_weighting", co2e_factors, gwp_key, emission_input_unit,
+                                         aeso_scenario, set_key)
+    return operating, embodied, total_factor
+
+# Columns of the long-form result table, after the Scenario/Region/Year/Source keys.
+# Shares are stored as float32 (they are only displayed as percentages); kWh, factors,
+# CO2e and contributions stay float64 since the g-unit values are shown to 5-6 decimals.
+RESULT_COLUMNS = {
+    'kWh': np.float64,
+    'Operating kgCO2/kWh': np.float64,
+    'Embodied kgCO2/kWh': np.float64,
+    'Total kgCO2/kWh': np.float64,
+    '% of electricity': np.float32,
+    'Total kgCO2': np.float64,
+    '% of CO2': np.float32,
+    'Grid_Intensity_Contribution': np.float64,
+}
+
+def result_table(arrays: dict[str, np.ndarray], scenario: str | list[str]) -> pd.DataFrame:
+    """
+    One row per (region, year, source) of a compute_arrays result, ordered SECTORS x YEARS x
+    NEW_INDEX. For a compute_scenarios result pass the list of scenarios; rows are then
+    ordered by scenario first. Scenario/Region/Source are categoricals, Year is int16; the
+    value columns follow RESULT_COLUMNS (fractions, not percent).
+    """
+    names = [scenario] if isinstance(scenario, str) else list(scenario)
+    n_s, n_y, n_k = arrays["generation"].shape[-3:]
+    shape = (len(names), n_s, n_y, n_k)
+    block = n_s * n_y * n_k
+    n = len(names) * block
+    codes = np.arange(block)
+    categories = list(dict.fromkeys(names))  # no data/ scan: tables never depend on which workbooks exist
+    values = {
+        'kWh': arrays["generation"],
+        'Operating kgCO2/kWh': arrays["operating"],
+        'Embodied kgCO2/kWh': arrays["embodied"][:, None, :],
+        'Total kgCO2/kWh': arrays["total_factor"],
+        '% of electricity': arrays["share"],
+        'Total kgCO2': arrays["co2e"],
+        '% of CO2': arrays["co2e_share"],
+        'Grid_Intensity_Contribution': arrays["contribution"],
+    }
+    scenario_codes = np.array([categories.index(nm) for nm in names], dtype=np.int8)
+    return pd.DataFrame({
+        'Scenario': pd.Categorical.from_codes(np.repeat(scenario_codes, block), categories),
+        'Region': pd.Categorical.from_codes(np.tile((codes // (n_y * n_k)).astype(np.int8), len(names)), SECTORS),
+        'Year': np.tile(np.array(YEARS, dtype=np.int16)[codes // n_k % n_y], len(names)),
+        'Source': pd.Categorical.from_codes(np.tile((codes % n_k).astype(np.int8), len(names)), NEW_INDEX),
+        **{c: np.broadcast_to(values[c], shape).astype(dt).reshape(n) for c, dt in RESULT_COLUMNS.items()},
+    })
+
+def frames_from_table(table: pd.DataFrame) -> tuple[dict, dict, dict]:
+    """
+    The legacy per-region views of a single-scenario result_table: grid_by_year (region ->
+    one frame per year, indexed by source, kWh under the year's label), grid_intensity
+    (region -> kgCO2/kWh by year) and total_carbon (region -> year -> grid_by_year frame
+    plus the CO2e columns). Shares come from the table, so they carry its float32 precision.
+    """
+    n_s, n_y, n_k = len(SECTORS), len(YEARS), len(NEW_INDEX)
+    if len(table) != n_s * n_y * n_k:
+        raise ValueError(f"Expected a single-scenario table of {n_s * n_y * n_k} rows, got {len(table)}")
+    cols = {c: table[c].to_numpy(dtype=np.float64).reshape(n_s, n_y, n_k) for c in RESULT_COLUMNS}
+    by_year_cols = ['Operating kgCO2/kWh', 'Embodied kgCO2/kWh', 'Total kgCO2/kWh', '% of electricity']
+    co2e_cols = ['Total kgCO2', '% of CO2', 'Grid_Intensity_Contribution']
+    grid_by_year, grid_intensity, total_carbon = {}, {}, {}
+    for i, s in enumerate(SECTORS):
+        grid_intensity[s] = pd.Series(cols['Grid_Intensity_Contribution'][i].sum(axis=1), index=YEARS, name='kgCO2/kWh')
+        grid_by_year[s], total_carbon[s] = [], {}
+        for j, y in enumerate(YEARS):
+            df = pd.DataFrame({y: cols['kWh'][i, j], **{c: cols[c][i, j] for c in by_year_cols}}, index=NEW_INDEX)
+            grid_by_year[s].append(df)
+            total_carbon[s][y] = df.assign(**{c: cols[c][i, j] for c in co2e_cols})
+    return grid_by_year, grid_intensity, total_carbon
+
 def compute_structures(
     xlsx_path: Path,
     gwp: dict[str, float],
     emission_input_unit: str = "kg",   # <-- NEW: 'kg' or 'g' for model *inputs*
+    as_table: bool = True,
+    aeso_scenario: str = AESO_SCENARIO,
+    scenario: str | None = None,
+    factor_set: str = DEFAULT_FACTOR_SET,
+    as_frames: bool = False,
 ):
     """
     gwp: dict with keys 'CO2','CH4','N2O','SF6' (100-yr values)
-    emission_input_unit: whether the hard-coded factors below are kg or g per kWh.
+    emission_input_unit: whether the factor set's values (operating, embodied) are kg or g per kWh.
                          Internally we convert to kg for all computations.
+    aeso_scenario: AESO scenario supplying the per-year AB natgas CC/Cogen/SC split
+                   (held at 2022 before and 2041 after the projection window).
+    as_table: also build the long-form result table (see result_table) under 'table'.
+              The raw arrays are always under 'arrays'.
+    scenario: label for the table's Scenario column (default: looked up from the file name).
+    factor_set: emission-factor set under data/factor_sets/ (see compile_factor_set).
+    as_frames: also build the legacy per-region views (grid_by_year, grid_intensity,
+               total_carbon; see frames_from_table) from the table.
     """
-    # GWP100 factors
-    CO2_GWP100 = float(gwp['CO2'])
-    CH4_GWP100 = float(gwp['CH4'])
-    N2O_GWP100 = float(gwp['N2O'])
-    SF6_GWP100 = float(gwp['SF6'])
-
-    # Convert input factors to kg if they're provided in grams
-    mass_to_kg = _to_kg_factor(emission_input_unit)
-
-    Transmission_Efficiency = 1.0
-    years = [str(y) for y in range(2005, 2051)]
-    grid = load_total_grid(xlsx_path)
-    breakdown = build_breakdown()
-
-    # Operating factors per gas (baseline values are in kg per kWh; if you provide them in g, set emission_input_unit='g')
-    proc = {
-        'coal_bit': {'CO2':1.08,'CH4':0.00134,'N2O':2.57e-6,'SF6':1.192e-9},
-        'coal_lig': {'CO2':0.956,'CH4':0.00079,'N2O':2.57e-6,'SF6':4.02e-10},
-        'coal_sub': {'CO2':1.007,'CH4':0.00078,'N2O':1.86e-6,'SF6':1.74e-10},
-        'diesel':   {'CO2':0.993,'CH4':0.00096,'N2O':5.11e-5,'SF6':6.2e-9},
-        'heavy':    {'CO2':1.135,'CH4':0.00074,'N2O':4.76e-5,'SF6':2.52e-9},
-        'hydro_res':{'CO2':1.3e-4,'CH4':1.20e-7,'N2O':4.56e-9,'SF6':4e-12},
-        'hydro_riv':{'CO2':1.3e-4,'CH4':1.20e-7,'N2O':4.56e-9,'SF6':4e-12},
-        'natgas_cogen':  {'CO2':0.29436,'CH4':0.00076,'N2O':5.11e-6,'SF6':1.53e-10},
-        'natgas_comb':   {'CO2':0.349,'CH4':0.0009,'N2O':6.06e-6,'SF6':1.8e-10},
-        'natgas_convert':{'CO2':0.349,'CH4':0.00090,'N2O':6.06e-6,'SF6':1.8e-10},
-        'natgas_simple': {'CO2':0.544,'CH4':0.00141,'N2O':9.47e-6,'SF6':2.16e-10},
-        'nuclear':  {'CO2':0.00578,'CH4':1.06e-5,'N2O':4.17e-7,'SF6':2.23e-10},
-        'solar_conc': {'CO2':0.00085,'CH4':1.126e-6,'N2O':5.28e-8,'SF6':3.61e-10},
-        'solar_pv':  {'CO2':3.65e-6,'CH4':9.69e-9,'N2O':1.47e-10,'SF6':6.88e-13},
-        'wind':      {'CO2':5.35e-5,'CH4':1.94e-7,'N2O':1.74e-9,'SF6':4.53e-12},
-        'wood_cogen':{'CO2':0.03316,'CH4':5.93e-5,'N2O':4.03e-5,'SF6':4.82e-10},
-        'wood_simple':{'CO2':0.06174,'CH4':0.00012,'N2O':8.62e-5,'SF6':8.77e-10},
+    with span("model:compute_arrays"):
+        arrays = compute_arrays(xlsx_path, gwp, emission_input_unit, aeso_scenario, factor_set)
+    result = {
+        "sectors": SECTORS,
+        "years": list(YEARS),
+        "arrays": arrays,
     }
+    if as_table or as_frames:
+        with span("model:table"):
+            table = result_table(arrays, scenario or scenario_name(xlsx_path))
+        if as_table:
+            result["table"] = table
+        if as_frames:
+            with span("model:frames"):
+                result["grid_by_year"], result["grid_intensity"], result["total_carbon"] = frames_from_table(table)
+    return result
 
-    # Scale per-gas masses to kg if user says inputs are grams
-    proc_scaled = {
-        k: {g: v[g] * mass_to_kg for g in v}
-        for k, v in proc.items()
-    }
+# Arrays of a compute_scenarios result that carry the leading scenario axis; the factor
+# arrays ('operating', 'embodied', 'total_factor') are shared by every scenario.
+SCENARIO_ARRAYS = ("generation", "share", "intensity", "co2e", "co2e_share", "contribution")
 
-    # Convert to CO2e (kg/kWh)
-    procCO2eq = {
-        k: (v['CO2']*CO2_GWP100 + v['CH4']*CH4_GWP100 + v['N2O']*N2O_GWP100 + v['SF6']*SF6_GWP100) / Transmission_Efficiency
-        for k, v in proc_scaled.items()
-    }
+def split_scenarios(result: dict, as_table: bool = True) -> list[dict]:
+    """A compute_scenarios result as one compute_structures-shaped result per scenario, in order."""
+    out = []
+    for i, sc in enumerate(result["scenarios"]):
+        arrays = {k: v[i] if k in SCENARIO_ARRAYS else v for k, v in result["arrays"].items()}
+        single = {"sectors": SECTORS, "years": list(YEARS), "arrays": arrays}
+        if as_table:
+            single["table"] = result_table(arrays, sc)
+        out.append(single)
+    return out
 
-    Grid_ByYear: dict[str, list[pd.DataFrame]] = {}
-    for i, s in enumerate(SECTORS):
-        Grid_ByYear[s] = []
-        solar_cf = solar_breakdown['cf'][s]
-        wind_cf  = wind_breakdown['cf to 5%'][s]
-        cf_holder_solar, cf_holder_wind = 0.15, 0.5  # carried over
-
-        for j, y in enumerate(years):
-            block = grid[i].iloc[0:8, j+1].copy().to_frame()
-            block.index = NEW_INDEX
-            block.iloc[:, 0] = block.iloc[:, 0] * 1e6  # GWh -> kWh
-
-            # NG split overrides
-            natgas_CC = breakdown[s]['natgas']['CC%']
-            natgas_CO = breakdown[s]['natgas']['CO%']
-            natgas_SC = breakdown[s]['natgas']['SC%']
-            if s == 'AB':
-                natgas_CC = DDprojections['ratio CC'][2022]
-                natgas_CO = DDprojections['ratio Cogen'][2022]
-                natgas_SC = DDprojections['ratio SC'][2022]
-            if s == 'ON':
-                natgas_CC = IESO_natgas_breakdown['CC']
-                natgas_SC = IESO_natgas_breakdown['SC']
-                natgas_CO = IESO_natgas_breakdown['CO']
-
-            # Operating CO2e (kg/kWh)
-            op = pd.Series({
-                'Hydro / Wave / Tidal': procCO2eq['hydro_res']*breakdown[s]['hydro']['res%'] + procCO2eq['hydro_riv']*breakdown[s]['hydro']['riv%'],
-                'Wind':                 procCO2eq['wind'],
-                'Biomass / Geothermal': procCO2eq['wood_cogen']*0.5 + procCO2eq['wood_simple']*0.5,
-                'Solar':                procCO2eq['solar_pv'],
-                'Uranium':              procCO2eq['nuclear'],
-                'Coal & Coke':          procCO2eq['coal_bit']*breakdown[s]['coal']['bit%'] + procCO2eq['coal_sub']*breakdown[s]['coal']['sub%'] + procCO2eq['coal_lig']*breakdown[s]['coal']['lig%'],
-                'Natural Gas':          procCO2eq['natgas_comb']*natgas_CC + procCO2eq['natgas_cogen']*natgas_CO + procCO2eq['natgas_simple']*natgas_SC,
-                'Oil':                  procCO2eq['diesel']*breakdown[s]['oil']['diesel%'] + procCO2eq['heavy']*breakdown[s]['oil']['heavy%'],
-            }, name='Operating kgCO2/kWh')
-
-            # Embodied (baseline expressions are kg CO2e/kWh; if you provide them in g, set emission_input_unit='g')
-            emb = pd.Series({
-                'Hydro / Wave / Tidal': (0.018*breakdown[s]['hydro']['res%'] + 0.008*breakdown[s]['hydro']['riv%']) * mass_to_kg,
-                'Wind':                 (0.0001070049744 * (cf_holder_wind / wind_cf)) * mass_to_kg,
-                'Biomass / Geothermal': (0.032 + 0.0613) * mass_to_kg,
-                'Solar':                (0.00112363578 * (cf_holder_solar / solar_cf)) * mass_to_kg,
-                'Uranium':              (0.2653938859/(650*30*365*24*0.89*1000)) * mass_to_kg,
-                'Coal & Coke':          (35437946.91/(100*150000*1000)) * mass_to_kg,
-                'Natural Gas':          (5496684.453/(100*180000*1000)) * mass_to_kg,
-                'Oil':                  (500821.3393/(10*100000*1000)) * mass_to_kg,
-            }, name='Embodied kgCO2/kWh')
-
-            out = block.copy()
-            out[y] = block.iloc[:, 0]
-            out['Operating kgCO2/kWh'] = op
-            out['Embodied kgCO2/kWh'] = emb
-            out['Total kgCO2/kWh'] = out['Operating kgCO2/kWh'] + out['Embodied kgCO2/kWh']
-
-            total_elec = out[y].sum()
-            out['% of electricity'] = out[y] / total_elec if total_elec else 0.0
-            Grid_ByYear[s].append(out)
-
-    # Grid intensity (kg CO2e/kWh)
-    Grid_Intensity: dict[str, pd.Series] = {}
-    for s in SECTORS:
-        gi = {}
-        for y in years:
-            j = int(y) - 2005
-            df = Grid_ByYear[s][j]
-            gi[y] = (df['% of electricity'] * df['Total kgCO2/kWh']).sum()
-        Grid_Intensity[s] = pd.Series(gi, name='kgCO2/kWh')
-
-    # Year totals & shares (CO2e)
-    TotalCarbon: dict[str, dict[str, pd.DataFrame]] = {}
-    for s in SECTORS:
-        TotalCarbon[s] = {}
-        for y in years:
-            j = int(y) - 2005
-            df = Grid_ByYear[s][j].copy()
-            df['Total kgCO2'] = df['Total kgCO2/kWh'] * df[y]
-            tot = df['Total kgCO2'].sum()
-            df['% of CO2'] = df['Total kgCO2'] / tot if tot else 0.0
-            df['Grid_Intensity_Contribution'] = df['% of CO2'] * Grid_Intensity[s][y]
-            TotalCarbon[s][y] = df
+def stack_scenarios(results: list[dict], scenarios: list[str], as_table: bool = True) -> dict:
+    """
+    compute_structures results for the same GWP, unit and factor set stacked into a
+    compute_scenarios-shaped result (the inverse of split_scenarios).
+    """
+    first = results[0]["arrays"]
+    arrays = {k: np.stack([r["arrays"][k] for r in results]) if k in SCENARIO_ARRAYS else v for k, v in first.items()}
+    result = {"scenarios": list(scenarios), "sectors": SECTORS, "years": list(YEARS), "arrays": arrays}
+    if as_table:
+        result["table"] = result_table(arrays, list(scenarios))
+    return result
 
-    return {
+def compute_scenarios(
+    scenarios: list[str],
+    gwp: dict[str, float],
+    emission_input_unit: str = "kg",
+    as_table: bool = True,
+    aeso_scenario: str = AESO_SCENARIO,
+    factor_set: str = DEFAULT_FACTOR_SET,
+):
+    """
+    Several scenarios in one batched pass. Only the generation workbooks differ between
+    scenarios, so their tensors are stacked on a leading scenario axis and aggregated
+    against the shared factor stages at once; uncached workbooks are parsed in parallel
+    (see ingest_workbooks).
+
+    Same layout as compute_structures plus 'scenarios'; generation-derived arrays are shaped
+    (scenario, sector, year, source), while 'operating', 'total_factor' (sector, year,
+    source) and 'embodied' (sector, source) are shared by every scenario. The table holds
+    all scenarios, in the order given.
+    """
+    scenarios = list(scenarios)
+    with span("model:compute_scenarios"):
+        gen = ingest_workbooks([scenario_path(sc) for sc in scenarios])
+        with span("model:aggregate"):
+            arrays = aggregate(gen, *_factor_stages(gwp, emission_input_unit, aeso_scenario, factor_set))
+    result = {
+        "scenarios": scenarios,
         "sectors": SECTORS,
-        "years": [str(y) for y in range(2005, 2051)],
-        "grid_by_year": Grid_ByYear,
-        "grid_intensity": Grid_Intensity,
-        "total_carbon": TotalCarbon,
+        "years": list(YEARS),
+        "arrays": arrays,
     }
+    if as_table:
+        with span("model:table"):
+            result["table"] = result_table(arrays, scenarios)
+    return result
@@ -0,0 +1,193 @@
+# app/hourly.py
+"""
+Hourly (8760) grid intensity.
+
+The annual kWh per region and source from a scenario workbook is spread over the hours of
+each year with a normalized hourly generation profile per region and source, and hourly
+intensity is sum_k kWh_k(h) * f_k / sum_k kWh_k(h) with the annual total factors f.
+
+Profiles are read from data/hourly_profiles.parquet or data/hourly_profiles.csv (or
+CANGRID_HOURLY_PROFILES), in long form with columns Region, Source, Hour (0-8759) and
+Value. Values are normalized per Region/Source, so any non-negative weights will do.
+Region/Source pairs that are missing fall back to the Canada profile of that source, then
+to a flat profile; with no profile file at all every hour equals the annual intensity.
+
+Outputs are (sector, year, hour) float32 arrays written year-chunk by year-chunk into
+memory-mapped .npy files under .cache/hourly, keyed by the inputs' content, so a
+scenario costs a few MB of RAM however many hours are read.
+
+    python app/hourly.py --scenarios "2023 Current" --gwp AR6
+    python app/hourly.py --template data/hourly_profiles.csv     # flat profile to edit
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import grid_core
+from breakdown_params import params_key
+from cache_utils import atomic_write, cache_dir, file_digest
+from grid_core import (
+    AESO_SCENARIO, DATA_DIR, DEFAULT_FACTOR_SET, GWP_PRESETS, NEW_INDEX, SECTORS, _factor_stages, _safe_div,
+    compile_factor_set, discover_factor_sets, ingest_workbook, scenario_path, scenarios,
+)
+from instrument import span
+
+HOURS = 8760
+PROFILE_FILES = ("hourly_profiles.parquet", "hourly_profiles.csv")
+# Bump when the layout of the hourly outputs changes
+HOURLY_VERSION = 1
+
+def profile_path() -> Path | None:
+    """The hourly profile file in use, or None for flat profiles."""
+    env = os.getenv("CANGRID_HOURLY_PROFILES")
+    if env:
+        return Path(env).expanduser()
+    for name in PROFILE_FILES:
+        if (DATA_DIR / name).exists():
+            return DATA_DIR / name
+    return None
+
+@lru_cache(maxsize=4)
+def _load_profiles(path: str | None, digest: str | None) -> np.ndarray:
+    shape = (len(SECTORS), len(NEW_INDEX), HOURS)
+    if path is None:
+        return grid_core._frozen(np.full(shape, 1.0 / HOURS))
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    r = pd.Categorical(df["Region"], categories=SECTORS).codes
+    k = pd.Categorical(df["Source"], categories=NEW_INDEX).codes
+    h = df["Hour"].to_numpy(dtype=int)
+    ok = (r >= 0) & (k >= 0) & (h >= 0) & (h < HOURS)
+    weights = np.zeros(shape)
+    np.add.at(weights, (r[ok], k[ok], h[ok]), df["Value"].to_numpy(dtype=float)[ok].clip(min=0.0))
+
+    total = weights.sum(axis=2, keepdims=True)
+    have = total[:, :, 0] > 0
+    profiles = _safe_div(weights, total)
+    canada = SECTORS.index("Canada")
+    fallback = np.where(have[canada][:, None], profiles[canada], 1.0 / HOURS)     # (K, H)
+    profiles = np.where(have[:, :, None], profiles, fallback[None])
+    return grid_core._frozen(profiles)
+
+def load_profiles(path: Path | None = None) -> np.ndarray:
+    """(sector, source, hour) profiles, each summing to 1 over the year."""
+    path = path or profile_path()
+    if path is None:
+        return _load_profiles(None, None)
+    return _load_profiles(str(path), _digest(path))
+
+@lru_cache(maxsize=64)
+def _file_digest(file_key: tuple[str, int, int]) -> str:
+    return file_digest(Path(file_key[0]))
+
+def _digest(path: Path) -> str:
+    """file_digest of path, hashed once per file version (path, mtime, size)."""
+    return _file_digest(grid_core._file_key(path))
+
+def _key(xlsx_path: Path, gwp: dict, emission_input_unit: str, aeso_scenario: str, factor_set: str,
+         path: Path | None) -> str:
+    payload = json.dumps({
+        "version": HOURLY_VERSION,
+        "model": _digest(Path(grid_core.__file__)),
+        "params": params_key(),
+        "xlsx": _digest(Path(xlsx_path)),
+        "profiles": _digest(path) if path else "flat",
+        "gwp": gwp, "unit": emission_input_unit, "aeso": aeso_scenario,
+        "factors": compile_factor_set(factor_set)["digest"],
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+def _fill(intensity_path: Path, kwh_path: Path, gen: np.ndarray, co2e: np.ndarray,
+          profiles: np.ndarray, chunk_years: int) -> None:
+    """Write (sector, year, hour) intensity and kWh memmaps, chunk_years years at a time."""
+    shape = gen.shape[:2] + (HOURS,)
+    inten = np.lib.format.open_memmap(intensity_path, mode="w+", dtype=np.float32, shape=shape)
+    kwh = np.lib.format.open_memmap(kwh_path, mode="w+", dtype=np.float32, shape=shape)
+    for y0 in range(0, shape[1], chunk_years):
+        ys = slice(y0, y0 + chunk_years)
+        den = np.matmul(gen[:, ys], profiles)                                   # (S, chunk, H)
+        inten[:, ys] = _safe_div(np.matmul(co2e[:, ys], profiles), den)
+        kwh[:, ys] = den
+    inten.flush()
+    kwh.flush()
+
+def hourly_intensity(
+    xlsx_path: Path,
+    gwp: dict[str, float],
+    emission_input_unit: str = "kg",
+    aeso_scenario: str = AESO_SCENARIO,
+    chunk_years: int = 8,
+    factor_set: str = DEFAULT_FACTOR_SET,
+) -> dict[str, np.ndarray]:
+    """
+    Hourly grid intensity and total generation for every sector and year of one workbook.
+
+    Returns read-only memmaps 'intensity' (kg or g CO2e/kWh, per the input unit) and 'kwh',
+    both (sector, year, hour) float32 following SECTORS x YEARS, plus their 'paths'.
+    Already computed inputs are reopened from disk; otherwise years are evaluated
+    chunk_years at a time.
+    """
+    path = profile_path()
+    key = _key(xlsx_path, gwp, emission_input_unit, aeso_scenario, factor_set, path)
+    out = cache_dir("hourly")
+    paths = {name: out / f"{key}-{name}.npy" for name in ("intensity", "kwh")}
+    if not all(p.exists() for p in paths.values()):
+        with span("hourly:compute"):
+            gen = ingest_workbook(xlsx_path)                                    # (S, Y, K)
+            _, _, total_factor = _factor_stages(gwp, emission_input_unit, aeso_scenario, factor_set)
+            profiles = load_profiles(path)                                      # (S, K, H)
+            co2e = gen * total_factor
+
+            atomic_write(paths["kwh"], lambda tmp_k: atomic_write(
+                paths["intensity"], lambda tmp_i: _fill(tmp_i, tmp_k, gen, co2e, profiles, chunk_years)))
+    return {
+        "intensity": np.load(paths["intensity"], mmap_mode="r"),
+        "kwh": np.load(paths["kwh"], mmap_mode="r"),
+        "paths": paths,
+    }
+
+def write_profile_template(path: Path) -> Path:
+    """A flat long-form profile file (one row per region/source/hour) to fill in."""
+    idx = np.indices((len(SECTORS), len(NEW_INDEX), HOURS)).reshape(3, -1)
+    df = pd.DataFrame({
+        "Region": np.asarray(SECTORS)[idx[0]],
+        "Source": np.asarray(NEW_INDEX)[idx[1]],
+        "Hour": idx[2],
+        "Value": 1.0,
+    })
+    if Path(path).suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return Path(path)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Compute hourly grid intensity for scenarios (memory-mapped .npy outputs).")
+    ap.add_argument("--scenarios", nargs="+", default=scenarios(), choices=scenarios(), metavar="SCENARIO")
+    ap.add_argument("--gwp", default="AR6", choices=list(GWP_PRESETS))
+    ap.add_argument("--unit", default="kg", choices=["kg", "g"], help="model input unit for emission factors")
+    ap.add_argument("--factor-set", default=DEFAULT_FACTOR_SET, choices=list(discover_factor_sets()),
+                    help=f"emission-factor set under data/factor_sets/ (default: {DEFAULT_FACTOR_SET})")
+    ap.add_argument("--chunk-years", type=int, default=8)
+    ap.add_argument("--template", type=Path, default=None, help="write a flat profile file here and exit")
+    args = ap.parse_args(argv)
+
+    if args.template:
+        print(f"Wrote {write_profile_template(args.template)}", file=sys.stderr)
+        return 0
+    print(f"Profiles: {profile_path() or 'flat (no profile file)'}", file=sys.stderr)
+    for sc in args.scenarios:
+        res = hourly_intensity(scenario_path(sc), GWP_PRESETS[args.gwp], args.unit,
+                               chunk_years=args.chunk_years, factor_set=args.factor_set)
+        print(f"{sc}: {res['paths']['intensity']}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
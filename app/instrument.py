@@ -0,0 +1,116 @@
+# app/instrument.py
+"""
+Opt-in stage instrumentation. Set CANGRID_PROFILE=1 to enable; otherwise every helper
+here is a no-op.
+
+    with span("model:aggregate"):
+        ...
+
+Each span records wall time, peak traced memory above its starting point (tracemalloc)
+and, where known, a cache hit/miss. The tracemalloc peak is process-wide, so peak_mb is
+only reliable while spans run one at a time: spans open in other threads (concurrent
+Streamlit sessions, worker threads) reset and add to the same peak. Finished spans are kept per thread for the current
+Streamlit run (records() / reset()) and appended as JSON lines to CANGRID_PROFILE_LOG
+(default .cache/profile/spans.jsonl).
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+ENABLED = os.getenv("CANGRID_PROFILE", "").strip().lower() in ("1", "true", "yes", "on")
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+class _Span:
+    __slots__ = ("name", "t0", "mem0", "child_peak", "cache")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.t0 = time.perf_counter()
+        self.mem0 = tracemalloc.get_traced_memory()[0]
+        self.child_peak = 0
+        self.cache = None
+
+def _stack() -> list[_Span]:
+    if not hasattr(_local, "stack"):
+        _local.stack, _local.records = [], []
+    return _local.stack
+
+def _log_path() -> Path:
+    env = os.getenv("CANGRID_PROFILE_LOG")
+    if env:
+        return Path(env).expanduser()
+    from cache_utils import cache_dir
+    return cache_dir("profile") / "spans.jsonl"
+
+def _log(rec: dict) -> None:
+    with _log_lock, open(_log_path(), "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec) + "\n")
+
+@contextmanager
+def span(name: str, cache: bool = False):
+    """
+    Time a block. With cache=True the span counts as a cache hit unless record_cache(False)
+    is called inside it (for caches whose misses are only visible from within the body).
+    """
+    if not ENABLED:
+        yield None
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    stack = _stack()
+    sp = _Span(" > ".join([s.name for s in stack[-1:]] + [name]) if stack else name)
+    if cache:
+        sp.cache = "hit"
+    if stack:  # keep the parent's peak so far before the child resets the counter
+        stack[-1].child_peak = max(stack[-1].child_peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    stack.append(sp)
+    try:
+        yield sp
+    finally:
+        stack.pop()
+        peak = max(tracemalloc.get_traced_memory()[1], sp.child_peak)
+        if stack:
+            stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        rec = {
+            "span": sp.name,
+            "ms": round((time.perf_counter() - sp.t0) * 1e3, 3),
+            "peak_mb": round(max(peak - sp.mem0, 0) / 2**20, 3),
+            "cache": sp.cache,
+            "depth": len(stack),
+            "ts": time.time(),
+            "pid": os.getpid(),
+        }
+        _local.records.append(rec)
+        _log(rec)
+
+def record_cache(hit: bool) -> None:
+    """Mark the innermost open span as a cache hit or miss."""
+    if ENABLED and _stack():
+        _stack()[-1].cache = "hit" if hit else "miss"
+
+def timed_call(name: str, fn, *args):
+    """Call an lru_cache-wrapped fn inside a span, recording hit/miss from its cache_info()."""
+    if not ENABLED:
+        return fn(*args)
+    before = fn.cache_info().hits
+    with span(name):
+        out = fn(*args)
+        record_cache(fn.cache_info().hits > before)
+    return out
+
+def records() -> list[dict]:
+    """Spans finished in this thread since the last reset(), in completion order."""
+    _stack()
+    return list(_local.records)
+
+def reset() -> None:
+    _stack()
+    _local.records = []
@@ -0,0 +1,100 @@
+# app/result_store.py
+"""
+Disk-backed result store shared by every Streamlit worker on a host.
+
+st.cache_data is per process, so replicas recompute every scenario/GWP/unit after a
+deploy. Results are pickled into one file per key under a configurable directory
+(CANGRID_RESULT_STORE_DIR, default .cache/results). Writes are atomic (temp file +
+rename), reads refresh the file's mtime, and the oldest entries are evicted once the
+directory exceeds CANGRID_RESULT_STORE_MAX_MB (default 512).
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pickle
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from breakdown_params import params_key
+from cache_utils import atomic_write, cache_dir, file_digest
+from grid_core import compile_factor_set
+
+# Bump when the shape of compute_structures' result changes
+RESULT_VERSION = 2
+
+_MODEL_FILE = Path(__file__).resolve().parent / "grid_core.py"
+
+class ResultStore:
+    def __init__(self, directory: Path | None = None, max_bytes: int | None = None):
+        env_dir = os.getenv("CANGRID_RESULT_STORE_DIR")
+        self.directory = Path(directory or (Path(env_dir).expanduser() if env_dir else cache_dir("results")))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("CANGRID_RESULT_STORE_MAX_MB", "512")) * 2**20)
+        self._model_key = None
+
+    def key(self, xlsx_path: Path, **inputs) -> str:
+        """Key from the workbook contents, the model code/parameters and the remaining inputs."""
+        if self._model_key is None:
+            self._model_key = f"v{RESULT_VERSION}-{file_digest(_MODEL_FILE)}-{params_key()}"
+        payload = json.dumps({"model": self._model_key, "xlsx": file_digest(Path(xlsx_path)), **inputs},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pkl"
+
+    def get(self, key: str):
+        """Stored result or None. A hit refreshes the entry's LRU position."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        return result
+
+    def put(self, key: str, result) -> None:
+        def _write(tmp: Path):
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        atomic_write(self._path(key), _write)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the store fits in max_bytes."""
+        entries = []
+        for p in self.directory.glob("*.pkl"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def warm_up(store: ResultStore, jobs, compute) -> int:
+    """
+    Fill the store for each (xlsx_path, gwp, ef_unit, factor_set) job it does not hold yet,
+    keyed as the app keys them, with compute(xlsx_path, gwp, ef_unit, factor_set). Returns
+    how many were computed.
+    """
+    done = 0
+    for xlsx_path, gwp, ef_unit, factor_set in jobs:
+        key = store.key(xlsx_path, gwp=gwp, ef_unit=ef_unit, factors=compile_factor_set(factor_set)["digest"])
+        if not store._path(key).exists():
+            store.put(key, compute(xlsx_path, gwp, ef_unit, factor_set))
+            done += 1
+    return done
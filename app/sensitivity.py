@@ -0,0 +1,215 @@
+# app/sensitivity.py
+"""
+Global sensitivity of grid intensity to the model's inputs.
+
+Every input is a multiplier around its point estimate (1.0 = baseline):
+
+* proc:      each technology x gas operating factor ("coal_bit CO2", ...), leaving out
+             IDLE_TECHS, which no source split uses
+* split:     each technology weight inside a source split (hydro res%/riv%, coal
+             bit%/sub%/lig%, natgas CC%/CO%/SC%, oil heavy%/diesel%); the split is
+             renormalized to its original total, so only the ratios move. The natgas
+             weights also scale the AB (AESO) and ON (IESO) splits.
+* embodied:  each source's embodied factor
+* cf:        the solar and wind capacity factors behind the embodied terms (capped at 1)
+
+Two analyses are provided: one-at-a-time swings to the ends of the range (tornado charts)
+and variance-based Sobol first-order and total indices from a Saltelli design (Saltelli
+2010 / Jansen estimators). A sample matrix of any size is evaluated in one vectorized
+model call (a few matrix products over sector x year x source), so the D + 2 matrices of
+a Saltelli design cost D + 2 calls whatever the number of samples.
+"""
+from __future__ import annotations
+from pathlib import Path
+
+import numpy as np
+
+from grid_core import (
+    AESO_SCENARIO, DEFAULT_FACTOR_SET, GASES, NEW_INDEX, SECTORS, TECHS, TRANSMISSION_EFFICIENCY, YEARS,
+    _gwp_matrix, _safe_div, _to_kg_factor, breakdown_parameters, embodied_matrix,
+    get_params, ingest_workbook, mixing_tensor, proc_matrix,
+)
+
+# split parameter -> technology whose weight it scales
+SPLITS = {
+    "hydro res%": "hydro_res", "hydro riv%": "hydro_riv",
+    "coal bit%": "coal_bit", "coal sub%": "coal_sub", "coal lig%": "coal_lig",
+    "natgas CC%": "natgas_comb", "natgas CO%": "natgas_cogen", "natgas SC%": "natgas_simple",
+    "oil heavy%": "heavy", "oil diesel%": "diesel",
+}
+# technologies no source split gives any weight: their factors cannot move intensity
+IDLE_TECHS = ("natgas_convert", "solar_conc")
+PROC_TECHS = [t for t in TECHS if t not in IDLE_TECHS]
+PARAMETERS = (
+    [f"{t} {g}" for t in PROC_TECHS for g in GASES]
+    + list(SPLITS)
+    + [f"embodied {k}" for k in NEW_INDEX]
+    + ["solar cf", "wind cf"]
+)
+GROUPS = ["proc"] * (len(PROC_TECHS) * len(GASES)) + ["split"] * len(SPLITS) + ["embodied"] * len(NEW_INDEX) + ["cf"] * 2
+
+_N_PROC = len(PROC_TECHS) * len(GASES)
+_PROC_ROWS = [TECHS.index(t) for t in PROC_TECHS]
+_SPLIT = slice(_N_PROC, _N_PROC + len(SPLITS))
+_EMB = slice(_SPLIT.stop, _SPLIT.stop + len(NEW_INDEX))
+_SOLAR_CF, _WIND_CF = _EMB.stop, _EMB.stop + 1
+_RES, _RIV = PARAMETERS.index("hydro res%"), PARAMETERS.index("hydro riv%")
+_HYDRO, _WIND, _SOLAR = (NEW_INDEX.index(k) for k in ("Hydro / Wave / Tidal", "Wind", "Solar"))
+
+def model_inputs(xlsx_path: Path, gwp: dict, emission_input_unit: str = "kg",
+                 aeso_scenario: str = AESO_SCENARIO, factor_set: str = DEFAULT_FACTOR_SET) -> dict:
+    """Everything evaluate() needs for one workbook, GWP vector, unit and factor set."""
+    breakdown = breakdown_parameters()
+    p = get_params()
+    gen = ingest_workbook(xlsx_path)
+    mix = mixing_tensor(breakdown, aeso_scenario)                           # (S, Y, K, T)
+    idle = [TECHS.index(t) for t in IDLE_TECHS]
+    if mix[..., idle].any():
+        raise ValueError(f"Breakdown parameters give weight to {', '.join(IDLE_TECHS)}; update IDLE_TECHS")
+    mass_to_kg = _to_kg_factor(emission_input_unit)
+    t_res, t_riv = TECHS.index("hydro_res"), TECHS.index("hydro_riv")
+    # embodied hydro is linear in the res/riv weights: per-unit coefficients from a 100% split
+    unit_split = {s: {"hydro": {"res%": 1.0, "riv%": 0.0}} for s in SECTORS}
+    a_res = embodied_matrix(unit_split, factor_set=factor_set)[0, _HYDRO]
+    unit_split = {s: {"hydro": {"res%": 0.0, "riv%": 1.0}} for s in SECTORS}
+    a_riv = embodied_matrix(unit_split, factor_set=factor_set)[0, _HYDRO]
+    share = _safe_div(gen, gen.sum(axis=2, keepdims=True))                  # (S, Y, K)
+    # only ~150 of the S*Y*K technology mixes are distinct (the AB natgas split is the
+    # only one that moves by year): evaluate those, then share-weight them per sector-year
+    rows, which = np.unique(mix.reshape(-1, len(TECHS)), axis=0, return_inverse=True)
+    n_sy, n_k = gen.shape[0] * gen.shape[1], gen.shape[2]
+    row_weight = np.zeros((n_sy, len(rows)))
+    np.add.at(row_weight, (np.repeat(np.arange(n_sy), n_k), which.ravel()), share.ravel())
+    return {
+        "share": share,
+        "mix": rows,                                                        # (U, T)
+        "row_total": rows.sum(axis=1),
+        "row_weight": row_weight,                                           # (S*Y, U)
+        "split_techs": np.array([TECHS.index(t) for t in SPLITS.values()]),
+        "proc": proc_matrix(factor_set) * mass_to_kg / TRANSMISSION_EFFICIENCY,       # (T, G)
+        "gwp": _gwp_matrix(gwp)[0],
+        "hydro_res": mix[:, 0, _HYDRO, t_res],
+        "hydro_riv": mix[:, 0, _HYDRO, t_riv],
+        "hydro_coef": (a_res * mass_to_kg, a_riv * mass_to_kg),
+        "embodied": embodied_matrix(breakdown, factor_set=factor_set) * mass_to_kg,         # (S, K)
+        "solar_cf": p['solar_breakdown']['cf'].loc[SECTORS].to_numpy(dtype=float),
+        "wind_cf": p['wind_breakdown']['cf to 5%'].loc[SECTORS].to_numpy(dtype=float),
+    }
+
+def evaluate(inputs: dict, x: np.ndarray) -> np.ndarray:
+    """Intensity, kg (or g) CO2e/kWh, for an (n, len(PARAMETERS)) multiplier matrix -> (n, sector, year)."""
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    n = x.shape[0]
+    n_s, n_y, n_k = inputs["share"].shape
+
+    # operating: per-tech CO2e, then each source's weighted mean over its (rescaled) split
+    proc_scale = np.ones((n, *inputs["proc"].shape))
+    proc_scale[:, _PROC_ROWS] = x[:, :_N_PROC].reshape(n, len(PROC_TECHS), -1)
+    tech_co2e = (inputs["proc"] * proc_scale) @ inputs["gwp"]             # (n, T)
+    weight = np.ones((n, len(TECHS)))
+    weight[:, inputs["split_techs"]] = x[:, _SPLIT]
+    num = inputs["mix"] @ (weight * tech_co2e).T                            # (U, n)
+    den = inputs["mix"] @ weight.T
+    factor = _safe_div(num, den) * inputs["row_total"][:, None]
+    operating = (inputs["row_weight"] @ factor).T.reshape(n, n_s, n_y)
+
+    # embodied: per-source multipliers, hydro follows the res/riv split, wind/solar their cf
+    res, riv = inputs["hydro_res"] * x[:, _RES, None], inputs["hydro_riv"] * x[:, _RIV, None]   # (n, S)
+    total = inputs["hydro_res"] + inputs["hydro_riv"]
+    res, riv = _safe_div(res * total, res + riv), _safe_div(riv * total, res + riv)
+    emb = np.broadcast_to(inputs["embodied"], (n, n_s, n_k)).copy()
+    emb[:, :, _HYDRO] = inputs["hydro_coef"][0] * res + inputs["hydro_coef"][1] * riv
+    for k, cf, col in ((_SOLAR, inputs["solar_cf"], _SOLAR_CF), (_WIND, inputs["wind_cf"], _WIND_CF)):
+        emb[:, :, k] *= cf / np.minimum(cf * x[:, col, None], 1.0)
+    emb *= x[:, None, _EMB]
+    embodied = np.matmul(emb.transpose(1, 0, 2), inputs["share"].transpose(0, 2, 1)).transpose(1, 0, 2)
+    return operating + embodied
+
+def bounds(spread: float = 0.2) -> tuple[np.ndarray, np.ndarray]:
+    """Lower/upper multipliers per parameter: 1 -/+ spread."""
+    d = len(PARAMETERS)
+    return np.full(d, 1.0 - spread), np.full(d, 1.0 + spread)
+
+def tornado(
+    xlsx_path: Path,
+    gwp: dict[str, float],
+    spread: float = 0.2,
+    emission_input_unit: str = "kg",
+    aeso_scenario: str = AESO_SCENARIO,
+    factor_set: str = DEFAULT_FACTOR_SET,
+) -> dict:
+    """
+    One-at-a-time swings: each parameter at its lower and upper bound with the rest at 1.
+
+    Returns 'parameters', 'point' (sector, year) and 'low' / 'high' intensities
+    (parameter, sector, year); all 2 x len(PARAMETERS) + 1 runs are one evaluate() call.
+    """
+    inputs = model_inputs(xlsx_path, gwp, emission_input_unit, aeso_scenario, factor_set)
+    lo, hi = bounds(spread)
+    d = len(PARAMETERS)
+    x = np.ones((2 * d + 1, d))
+    x[np.arange(d), np.arange(d)] = lo
+    x[d + np.arange(d), np.arange(d)] = hi
+    out = evaluate(inputs, x)
+    return {"parameters": list(PARAMETERS), "point": out[-1], "low": out[:d], "high": out[d:2 * d]}
+
+def saltelli(f, lo: np.ndarray, hi: np.ndarray, n: int, seed: int = 0) -> dict[str, np.ndarray]:
+    """
+    Sobol first-order (Saltelli 2010) and total (Jansen) indices of f over inputs uniform
+    on [lo, hi]. f maps an (n, d) sample matrix to (n, m) outputs; it is called d + 2 times.
+
+    Returns 'first' and 'total' (d, m) and 'variance' (m,); outputs with no variance get zero indices.
+    """
+    d = len(lo)
+    rng = np.random.default_rng(seed)
+    a = rng.uniform(lo, hi, size=(n, d))
+    b = rng.uniform(lo, hi, size=(n, d))
+    f_a = f(a).reshape(n, -1)
+    f_b = f(b).reshape(n, -1)
+    # centring on the sample mean keeps the estimators' variance down when the mean >> spread
+    mean = np.concatenate([f_a, f_b]).mean(axis=0)
+    f_a -= mean
+    f_b -= mean
+    var = np.concatenate([f_a, f_b]).var(axis=0)
+
+    first = np.empty((d, f_a.shape[1]))
+    total = np.empty((d, f_a.shape[1]))
+    ab = a.copy()
+    for i in range(d):
+        ab[:, i] = b[:, i]
+        f_ab = f(ab).reshape(n, -1) - mean
+        ab[:, i] = a[:, i]
+        first[i] = np.mean(f_b * (f_ab - f_a), axis=0)
+        total[i] = 0.5 * np.mean((f_a - f_ab) ** 2, axis=0)
+    return {"first": _safe_div(first, var), "total": _safe_div(total, var), "variance": var}
+
+def sobol_indices(
+    xlsx_path: Path,
+    gwp: dict[str, float],
+    n: int = 1024,
+    spread: float = 0.2,
+    seed: int = 0,
+    emission_input_unit: str = "kg",
+    aeso_scenario: str = AESO_SCENARIO,
+    factor_set: str = DEFAULT_FACTOR_SET,
+) -> dict:
+    """
+    Sobol first-order and total indices of intensity per sector and year, with every
+    parameter uniform on bounds(spread). The Saltelli design takes n x (len(PARAMETERS) + 2)
+    model runs; each of its sample matrices is one evaluate() call.
+
+    Returns 'parameters', 'first' and 'total' (parameter, sector, year), 'variance'
+    (sector, year) and 'n_runs'. Cells with no variance (no generation) get zero indices.
+    """
+    inputs = model_inputs(xlsx_path, gwp, emission_input_unit, aeso_scenario, factor_set)
+    lo, hi = bounds(spread)
+    d = len(PARAMETERS)
+    res = saltelli(lambda x: evaluate(inputs, x), lo, hi, n, seed)
+    shape = (d, len(SECTORS), len(YEARS))
+    return {
+        "parameters": list(PARAMETERS),
+        "first": res["first"].reshape(shape),
+        "total": res["total"].reshape(shape),
+        "variance": res["variance"].reshape(shape[1:]),
+        "n_runs": n * (d + 2),
+    }
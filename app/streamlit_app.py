@@ -1,18 +1,49 @@
 # app/streamlit_app.py
 import streamlit as st
 import plotly.express as px
+import plotly.io as pio
+import numpy as np
 import pandas as pd
-from io import StringIO
 from pathlib import Path
 from typing import List
 import warnings
 import re
+import os
 import traceback
-
-from grid_core import compute_structures, NEW_INDEX, SECTORS
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+from instrument import record_cache, span
+from grid_core import (
+    compute_structures, compute_scenarios, NEW_INDEX, SECTORS, YEARS, DATA_DIR,
+    GWP_AR5, GWP_AR6, GWP_PRESETS, DEFAULT_FACTOR_SET, compile_factor_set, discover_factor_sets,
+    ingest_workbooks, refresh_scenarios, scenario_path, scenarios as available_scenarios, split_scenarios,
+    stack_scenarios,
+)
+from attribution import attribution_long, intensity_attribution
+from budget import annual_emissions, cumulative, exhaustion_year
+from hourly import HOURS, hourly_intensity, profile_path
+from batch_export import TABLES as BUNDLE_TABLES
+from bundle_export import FORMATS as BUNDLE_FORMATS, bundle_path, write_bundle
+from result_store import ResultStore, warm_up
+from sensitivity import GROUPS as SENS_GROUPS, sobol_indices, tornado
+from tables import chart_frames
 
 # --- UPDATED: New page title for browser tab ---
 st.set_page_config(page_title="CanGrid Dashboard", page_icon='cangrid.png', layout="wide")
+instrument.reset()  # per-rerun span records (no-op unless CANGRID_PROFILE=1)
+for new_scenario in refresh_scenarios():  # workbooks dropped into data/ since the last rerun
+    st.toast(f"New scenario workbook: {new_scenario}")
+scenario_names = available_scenarios()
+if not scenario_names:
+    st.error(f"No readable scenario workbooks in {DATA_DIR}.")
+    st.stop()
+
+def default_scenarios(*preferred: str) -> list[str]:
+    # the preferred scenarios that exist, topped up from the latest found so renamed files still work
+    picks = [sc for sc in preferred if sc in scenario_names]
+    picks += [sc for sc in reversed(scenario_names) if sc not in picks]
+    return picks[:len(preferred)]
 
 # --- Centralized Plotly config ---
 PLOTLY_CONFIG = {
@@ -47,36 +78,32 @@ def _guarded_plotly_chart(*args, **kwargs):
 
 st.plotly_chart = _guarded_plotly_chart
 
+FACET_WRAP = 4          # facet panels per row
+FACET_ROW_HEIGHT = 300  # px per row of wrapped facets
+
 def show(fig):
     # modern width API (replacement for deprecated use_container_width)
-    _orig_plotly_chart(fig, config=PLOTLY_CONFIG)
-
-# ---------- Scenario file mapping ----------
-SCENARIO_TO_FILE = {
-    "2021 Current":              "Electricity_Generation_2021_Current.xlsx",
-    "2021 Evolving":             "Electricity_Generation_2021_Evolving.xlsx",
-    "2023 Canada Net Zero":      "Electricity_Generation_2023_Canada_Net_Zero.xlsx",
-    "2023 Current":              "Electricity_Generation_2023_Current.xlsx",
-    "2023 Global Net Zero":      "Electricity_Generation_2023_Global_Net_Zero.xlsx",
-}
-SCENARIOS = list(SCENARIO_TO_FILE.keys())
-DATA_DIR = Path(__file__).resolve().parents[1] / "data"
-
-# ---------- GWP presets (100-year) ----------
-GWP_AR5 = {"CO2": 1.0, "CH4": 28.0,  "N2O": 265.0, "SF6": 23500.0}
-GWP_AR6 = {"CO2": 1.0, "CH4": 27.2,  "N2O": 273.0, "SF6": 25200.0}
+    with span("plotly"):
+        if isinstance(fig, str):
+            # cached JSON spec (see chart_figure): it was valid when built, so skip re-validation
+            fig = pio.from_json(fig, skip_invalid=True)
+        _orig_plotly_chart(fig, config=PLOTLY_CONFIG)
 
 @st.cache_data(show_spinner=False)
-def load_all(xlsx_path: Path, gwp: dict, ef_unit: str):
+def load_all(xlsx_path: Path, gwp: dict, ef_unit: str, factor_set: str = DEFAULT_FACTOR_SET):
     # ef_unit: 'kg' or 'g' -> passed to the model as its INPUT unit
-    return compute_structures(xlsx_path, gwp, emission_input_unit=ef_unit)
+    # A miss here (new GWP/unit/factor set) only reruns the later model stages: ingest,
+    # breakdowns and the mixing weights are memoized inside grid_core on their own inputs.
+    return compute_structures(xlsx_path, gwp, emission_input_unit=ef_unit, factor_set=factor_set)
 
 def download_button_for_table(df: pd.DataFrame, filename_hint: str):
-    csv_buf = StringIO()
-    df.to_csv(csv_buf, index=False)
+    # Serialized only when the button is clicked (Streamlit calls data() on download)
+    def csv_bytes() -> bytes:
+        with span("csv"):
+            return df.to_csv(index=False).encode("utf-8")
     st.download_button(
         label="⬇️ Download table as CSV",
-        data=csv_buf.getvalue(),
+        data=csv_bytes,
         file_name=f"{filename_hint}.csv",
         mime="text/csv",
         width="stretch",
@@ -100,10 +127,10 @@ with col_image:
     )
 
 # ---------- Controls row 1: compare + GWP + CO2e units (combined) ----------
-c1, c2, c3 = st.columns([1.4, 1, 1.3])
+c1, c2, c3, c4 = st.columns([1.4, 1, 1.3, 1.2])
 
 with c1:
-    compare_mode = st.selectbox("Compare mode", ["None", "Multi-scenario", "Multi-region"], index=0)
+    compare_mode = st.selectbox("Compare mode", ["None", "Multi-scenario", "Multi-region", "Scenario delta", "Carbon budget"], index=0)
 
 with c2:
     gwp_mode = st.radio("GWP (100-yr)", ["AR6", "AR5", "Custom"], index=0, horizontal=True)
@@ -115,6 +142,18 @@ with c3:
         index=0
     )
 
+with c4:
+    # every <set>.toml under data/factor_sets/; picked up on the next rerun like scenario workbooks
+    factor_sets = list(discover_factor_sets())
+    factor_set = st.selectbox("Emission factors", factor_sets,
+                              index=factor_sets.index(DEFAULT_FACTOR_SET) if DEFAULT_FACTOR_SET in factor_sets else 0)
+    try:
+        factor_info = compile_factor_set(factor_set)
+    except (KeyError, ValueError) as e:
+        st.error(e.args[0] if e.args else str(e))
+        st.stop()
+    st.caption(f"{factor_info['title']} v{factor_info['version']}")
+
 # --- Combined unit wiring ---
 ef_unit = "kg" if co2e_unit_label.startswith("kg") else "g"  # model INPUT unit
 if co2e_unit_label.startswith("g"):
@@ -146,14 +185,148 @@ gwp = {"CO2": gwp_CO2, "CH4": gwp_CH4, "N2O": gwp_N2O, "SF6": gwp_SF6}
 # =========================
 #     LOADERS (CACHED)
 # =========================
+@st.cache_resource(show_spinner=False)
+def result_store() -> ResultStore:
+    return ResultStore()
+
+@st.cache_resource(show_spinner=False)
+def warmup_job():
+    # Once per server process with CANGRID_WARMUP=1: every scenario x GWP preset (kg inputs)
+    # into the shared result store, so the first visitor after a deploy reads from disk
+    def _run():
+        paths = [scenario_path(sc) for sc in available_scenarios()]
+        ingest_workbooks(paths)
+        jobs = [(path, dict(g), "kg", DEFAULT_FACTOR_SET) for g in GWP_PRESETS.values() for path in paths]
+        return warm_up(result_store(), jobs, lambda path, g, unit, fs: compute_structures(
+            path, g, emission_input_unit=unit, factor_set=fs))
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="cangrid-warmup").submit(_run)
+
+if os.getenv("CANGRID_WARMUP", "0") == "1":
+    warmup_job()
+
+@st.cache_data(show_spinner=False)
+def get_data_for_scenario(scenario: str, gwp: dict, ef_unit: str, factor_set: str = DEFAULT_FACTOR_SET):
+    # Shared on-disk store first, so other workers/replicas on this host reuse our results
+    xlsx_path = scenario_path(scenario)
+    record_cache(False)  # only runs on a st.cache_data miss
+    store = result_store()
+    key = store.key(xlsx_path, gwp=gwp, ef_unit=ef_unit, factors=compile_factor_set(factor_set)["digest"])
+    with span("result_store"):
+        data = store.get(key)
+        record_cache(data is not None)
+    if data is None:
+        data = load_all(xlsx_path, gwp, ef_unit, factor_set)
+        store.put(key, data)
+    return data
+
 @st.cache_data(show_spinner=False)
-def get_data_for_scenario(scenario: str, gwp: dict, ef_unit: str):
-    xlsx_path = DATA_DIR / SCENARIO_TO_FILE[scenario]
-    return load_all(xlsx_path, gwp, ef_unit)
+def get_many_scenarios(scenarios: List[str], gwp: dict, ef_unit: str, factor_set: str = DEFAULT_FACTOR_SET):
+    # Per-scenario results from the shared store (keyed as get_data_for_scenario keys them);
+    # the misses go through one batched model pass, workbooks not yet parsed fanned out over
+    # a process pool (grid_core.ingest_workbooks), and are written back one scenario each
+    record_cache(False)  # only runs on a st.cache_data miss
+    store = result_store()
+    factors = compile_factor_set(factor_set)["digest"]
+    keys = {sc: store.key(scenario_path(sc), gwp=gwp, ef_unit=ef_unit, factors=factors) for sc in scenarios}
+    with span("result_store"):
+        found = {sc: store.get(key) for sc, key in keys.items()}
+        missing = [sc for sc in scenarios if found[sc] is None]
+        record_cache(not missing)
+    if missing:
+        batch = compute_scenarios(missing, gwp, emission_input_unit=ef_unit, as_table=False, factor_set=factor_set)
+        for sc, data in zip(missing, split_scenarios(batch)):
+            store.put(keys[sc], data)
+            found[sc] = data
+    return stack_scenarios([found[sc] for sc in scenarios], scenarios)
 
 @st.cache_data(show_spinner=False)
-def get_many_scenarios(scenarios: List[str], gwp: dict, ef_unit: str):
-    return {sc: get_data_for_scenario(sc, gwp, ef_unit) for sc in scenarios}
+def get_tornado(scenario: str, gwp: dict, ef_unit: str, spread: float, factor_set: str = DEFAULT_FACTOR_SET):
+    record_cache(False)  # only runs on a st.cache_data miss
+    return tornado(scenario_path(scenario), gwp, spread, emission_input_unit=ef_unit, factor_set=factor_set)
+
+@st.cache_data(show_spinner="Running Sobol analysis…")
+def get_sobol(scenario: str, gwp: dict, ef_unit: str, spread: float, n: int, factor_set: str = DEFAULT_FACTOR_SET):
+    record_cache(False)  # only runs on a st.cache_data miss
+    return sobol_indices(scenario_path(scenario), gwp, n=n, spread=spread, emission_input_unit=ef_unit,
+                         factor_set=factor_set)
+
+@st.cache_data(show_spinner=False)
+def get_cumulative(scenarios: tuple, gwp: dict, ef_unit: str, start_year: int, factor_set: str = DEFAULT_FACTOR_SET):
+    # Cumulative tonnes for every scenario x region x year (x source) from start_year; the
+    # budget slider only compares against these, so dragging it never reruns the model
+    record_cache(False)  # only runs on a st.cache_data miss
+    res = compute_scenarios(list(scenarios), gwp, emission_input_unit=ef_unit, as_table=False, factor_set=factor_set)
+    annual = annual_emissions(res["arrays"], ef_unit)
+    return {
+        "scenarios": res["scenarios"],
+        "total": cumulative(annual["total"], start_year=start_year),                     # (N, S, Y)
+        "by_source": cumulative(annual["by_source"], year_axis=-2, start_year=start_year),  # (N, S, Y, K)
+    }
+
+@st.fragment
+def budget_view(cum: dict, sector: str, start: int, gwp_label: str):
+    # Reruns on its own while the slider moves
+    i = SECTORS.index(sector)
+    region_mt = cum["total"][:, i] / 1e6                                     # (N, Y) Mt
+    top = max(float(region_mt[:, -1].max()), 1e-3)
+    step = float(f"{top / 500:.1g}")
+    budget = st.slider(f"Carbon budget for {sector} (Mt CO₂e from {start})", step, round(top * 1.2, 3),
+                       value=round(top / 2 / step) * step, step=step)
+    exhausted = exhaustion_year(cum["total"] / 1e6, budget, start)                  # (N, S) for every region
+
+    long = pd.DataFrame({
+        "Scenario": np.repeat(cum["scenarios"], len(YEARS)),
+        "Year": np.tile(np.array(YEARS, dtype=int), len(cum["scenarios"])),
+        "Mt CO₂e": region_mt.ravel(),
+    })
+    long = long[long["Year"] >= start]
+    fig = px.line(long, x="Year", y="Mt CO₂e", color="Scenario", render_mode="webgl",
+                  title=f"{sector} – Cumulative CO₂e from {start} vs a {budget:,.4g} Mt Budget ({gwp_label})")
+    fig.add_hline(y=budget, line_dash="dash", annotation_text="Budget", annotation_position="top left")
+    fig.update_yaxes(title_text="Cumulative Mt CO₂e", tickformat=",.4g", rangemode="tozero")
+    show(fig)
+
+    s_out = pd.DataFrame({
+        "Scenario": cum["scenarios"],
+        "Budget exhausted in": pd.array(exhausted[:, i], dtype="Int64"),
+        f"Cumulative {start}–{YEARS[-1]} (Mt)": region_mt[:, -1],
+        f"Remaining in {YEARS[-1]} (Mt)": budget - region_mt[:, -1],
+    }).round(4)
+    st.dataframe(s_out, hide_index=True)
+    download_button_for_table(s_out, f"carbon_budget_{sector}_{start}_{budget:g}Mt_{gwp_label}")
+
+    st.markdown(f"**Year a {budget:,.4g} Mt budget is used up, every region** (blank: lasts past {YEARS[-1]})")
+    all_regions = pd.DataFrame(exhausted, index=pd.Index(cum["scenarios"], name="Scenario"), columns=SECTORS).astype("Int64")
+    st.dataframe(all_regions)
+    download_button_for_table(all_regions.reset_index(), f"carbon_budget_all_regions_{start}_{budget:g}Mt_{gwp_label}")
+
+    by_source = pd.DataFrame(cum["by_source"][:, i, -1] / 1e6, index=pd.Index(cum["scenarios"], name="Scenario"),
+                             columns=NEW_INDEX).round(4)
+    st.markdown(f"**{sector}: cumulative Mt CO₂e by source, {start}–{YEARS[-1]}**")
+    st.dataframe(by_source)
+
+CHART_IDS = {
+    "Total Intensity (line)": "intensity",
+    "Energy Mix (% stacked bar, every 5 years)": "mix_percent",
+    "Energy Mix (stacked bar, every 5 years)": "mix_energy",
+    "CO₂e Contribution (stacked bar, every 5 years)": "contrib",
+    "CO₂e Share by Source (% stacked bar, every 5 years)": "co2e_share",
+    "Emissions by Source (Operating vs Embodied, single year)": "emissions_split",
+}
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def chart_data(chart_id: str, scenarios: tuple, regions: tuple, gwp: dict, ef_unit: str,
+               by: str | None, year: int | None, em_scale: float, em_label: str,
+               factor_set: str = DEFAULT_FACTOR_SET):
+    # (figure frame, display table) per chart, keyed on scenario(s), region(s), chart, unit and
+    # GWP: widget changes that leave these alone skip the slicing/pivoting entirely
+    record_cache(False)  # only runs on a st.cache_data miss
+    if by == "Scenario":
+        data = get_many_scenarios(list(scenarios), gwp, ef_unit, factor_set)
+    else:
+        data = get_data_for_scenario(scenarios[0], gwp, ef_unit, factor_set)
+    return chart_frames(data, chart_id, regions, by=by, year=year, em_scale=em_scale, em_label=em_label,
+                        elec_label=ELEC_LABEL, elec_div=elec_div)
 
 # =========================
 #     SECONDARY CONTROLS
@@ -161,28 +334,58 @@ def get_many_scenarios(scenarios: List[str], gwp: dict, ef_unit: str):
 colA, colB = st.columns([1.4, 2])
 
 with colA:
-    chart = st.selectbox(
-        "Chart",
-        [
+    if compare_mode == "Scenario delta":
+        chart_options = [
+            "Intensity Change Attribution (mix vs factor, every 5 years)",
+            "Intensity Change Attribution (mix vs factor, single year)",
+        ]
+    elif compare_mode == "Carbon budget":
+        chart_options = ["Cumulative Emissions vs Carbon Budget (line, all scenarios)"]
+    else:
+        chart_options = [
             "Total Intensity (line)",
             "Energy Mix (% stacked bar, every 5 years)",
             "Energy Mix (stacked bar, every 5 years)",  # fixed TWh
             "CO₂e Contribution (stacked bar, every 5 years)",
             "CO₂e Share by Source (% stacked bar, every 5 years)",
             "Emissions by Source (Operating vs Embodied, single year)",
-        ],
-        index=0
-    )
+        ]
+        if compare_mode == "None":
+            chart_options += [
+                "Hourly Intensity (heatmap, single year)",
+                "Sensitivity – Tornado (one input at a time, single year)",
+                "Sensitivity – Sobol Indices (single year)",
+            ]
+    chart = st.selectbox("Chart", chart_options, index=0)
 
 with colB:
     if compare_mode == "Multi-scenario":
-        scenario_list = st.multiselect("Scenarios", SCENARIOS, default=["2023 Current", "2023 Global Net Zero"])
+        scenario_list = st.multiselect("Scenarios", scenario_names, default=default_scenarios("2023 Current", "2023 Global Net Zero"))
         sector = st.selectbox("Region", SECTORS, index=SECTORS.index("Canada"))
     elif compare_mode == "Multi-region":
-        scenario = st.selectbox("Scenario", SCENARIOS, index=SCENARIOS.index("2023 Current"))
+        scenario = st.selectbox("Scenario", scenario_names, index=scenario_names.index(default_scenarios("2023 Current")[0]))
         sectors_chosen = st.multiselect("Regions", SECTORS, default=["Canada", "AB", "ON", "QC"])
+    elif compare_mode == "Scenario delta":
+        b1, b2 = st.columns(2)
+        with b1:
+            base_scenario = st.selectbox("Baseline scenario", scenario_names, index=scenario_names.index(default_scenarios("2023 Current")[0]))
+        with b2:
+            scenario = st.selectbox("Compared scenario", scenario_names, index=scenario_names.index(default_scenarios("2023 Current", "2023 Global Net Zero")[-1]))
+        b3, b4, b5 = st.columns(3)
+        with b3:
+            sector = st.selectbox("Region", SECTORS, index=SECTORS.index("Canada"))
+        with b4:
+            base_gwp_mode = st.radio("Baseline GWP", ["Same", *GWP_PRESETS], index=0, horizontal=True)
+        with b5:
+            base_factor_mode = st.selectbox("Baseline emission factors", ["Same", *factor_sets], index=0)
+    elif compare_mode == "Carbon budget":
+        b1, b2 = st.columns(2)
+        with b1:
+            sector = st.selectbox("Region", SECTORS, index=SECTORS.index("Canada"))
+        with b2:
+            budget_start = st.selectbox("Budget counted from", list(range(2005, 2051)), index=(2020-2005))
     else:
-        scenario = st.selectbox("Scenario", SCENARIOS, index=SCENARIOS.index("2023 Current"))
+        scenario = st.selectbox("Scenario", scenario_names, index=scenario_names.index(default_scenarios("2023 Current")[0]))
         sector = st.selectbox("Region", SECTORS, index=SECTORS.index("Canada"))
 
 # Year control appears only for the single-year chart
@@ -192,88 +395,32 @@ def pick_year_control():
 # =========================
 #      DATA HANDLES
 # =========================
-if compare_mode == "Multi-scenario":
-    if not scenario_list:
-        st.warning("Pick at least one scenario.")
+# The standard charts fetch their model results inside chart_data (cached per chart), so
+# a rerun that hits that cache never unpickles the full results.
+years = list(YEARS)
+if compare_mode == "Multi-scenario" and not scenario_list:
+    st.warning("Pick at least one scenario.")
+    st.stop()
+elif compare_mode == "Multi-region" and not sectors_chosen:
+    st.warning("Pick at least one region.")
+    st.stop()
+elif compare_mode == "Scenario delta":
+    # the baseline is any scenario x GWP preset x factor set run, in the same input unit
+    base_gwp = gwp if base_gwp_mode == "Same" else GWP_PRESETS[base_gwp_mode]
+    base_factor_set = factor_set if base_factor_mode == "Same" else base_factor_mode
+    try:
+        compile_factor_set(base_factor_set)
+    except (KeyError, ValueError) as e:
+        st.error(e.args[0] if e.args else str(e))
         st.stop()
-    data_by_scenario = get_many_scenarios(scenario_list, gwp, ef_unit)
-    years = next(iter(data_by_scenario.values()))["years"]
-elif compare_mode == "Multi-region":
-    if not sectors_chosen:
-        st.warning("Pick at least one region.")
-        st.stop()
-    data = get_data_for_scenario(scenario, gwp, ef_unit)
-    years = data["years"]
-else:
-    data = get_data_for_scenario(scenario, gwp, ef_unit)
-    years = data["years"]
-
-# =========================
-#  TABLE BUILDING HELPERS (unit-aware)
-# =========================
-def table_mix_percent_single(data_dict, sector: str, step=5):
-    frames = []
-    for y in years[::step]:
-        k = int(y) - 2005
-        df = data_dict["grid_by_year"][sector][k][["% of electricity"]].copy()
-        df.columns = [y]
-        frames.append(df)
-    out = pd.concat(frames, axis=1) * 100
-    out.index.name = "Source"
-    return out
-
-def table_mix_energy_single(data_dict, sector: str, step=5):
-    # Base column y is kWh; convert to fixed TWh
-    frames = []
-    for y in years[::step]:
-        k = int(y) - 2005
-        df = data_dict["grid_by_year"][sector][k][[y]].copy() / elec_div
-        df.columns = [y]
-        frames.append(df)
-    out = pd.concat(frames, axis=1)
-    out.index.name = "Source"
-    return out
-
-def table_contrib_single(data_dict, sector: str, step=5):
-    frames = []
-    for y in years[::step]:
-        df = data_dict["total_carbon"][sector][y][["Grid_Intensity_Contribution"]].copy()
-        df.columns = [y]
-        frames.append(df * em_scale)
-    out = pd.concat(frames, axis=1)
-    out.index.name = "Source"
-    return out
-
-def table_co2e_share_single(data_dict, sector: str, step=5):
-    frames = []
-    for y in years[::step]:
-        df = data_dict["total_carbon"][sector][y][["% of CO2"]].copy() * 100
-        df.columns = [y]
-        frames.append(df)
-    out = pd.concat(frames, axis=1)
-    out.index.name = "Source"
-    return out
-
-def table_emissions_split_single_year(data_dict, sector: str, year: int):
-    df = data_dict["grid_by_year"][sector][year - 2005][["Operating kgCO2/kWh","Embodied kgCO2/kWh"]].copy()
-    df *= em_scale
-    df.columns = [f"Operating {EM_LABEL}", f"Embodied {EM_LABEL}"]
-    df.index.name = "Source"
-    return df
-
-# ---------- Robust Series→DataFrame helper for intensity line charts ----------
-def _intensity_to_df(series: pd.Series, scale: float) -> pd.DataFrame:
-    """
-    Ensure a two-column DataFrame with ['Year', 'kgCO2e/kWh'] from a Series,
-    regardless of whether reset_index() names the first column 'index' or 'Year'.
-    Also applies the selected display-unit scale.
-    """
-    df = series.rename("kgCO2e/kWh").reset_index()
-    first_col = df.columns[0]
-    if first_col != "Year":
-        df.rename(columns={first_col: "Year"}, inplace=True)
-    df["kgCO2e/kWh"] = df["kgCO2e/kWh"] * scale
-    return df
+    base_label = ", ".join([base_scenario]
+                           + ([base_gwp_mode] if base_gwp_mode != "Same" else [])
+                           + ([base_factor_set] if base_factor_mode != "Same" else []))
+    with span("data:get_data_for_scenario", cache=True):
+        base_data = get_data_for_scenario(base_scenario, base_gwp, ef_unit, base_factor_set)
+        data = get_data_for_scenario(scenario, gwp, ef_unit, factor_set)
+    with span("data:attribution"):
+        attr = intensity_attribution(base_data["arrays"], data["arrays"])
 
 # =========================
 #  AXIS STYLING HELPERS (dynamic titles, ticks, hover)
@@ -300,203 +447,268 @@ def style_percent_axis(fig, ytitle: str):
     fig.update_yaxes(title_text=ytitle, tickformat=".0f", ticksuffix="%", range=[0, 100])
     fig.update_traces(hovertemplate="%{y:.1f}%<extra></extra>")
 
-# =========================
-#      RENDER SECTIONS (with dynamic axes)
-# =========================
-if compare_mode == "None":
-    # ---------- SINGLE SCENARIO / SINGLE REGION ----------
-    if chart == "Total Intensity (line)":
-        df = _intensity_to_df(data["grid_intensity"][sector], em_scale)
-        s_out = df.rename(columns={"kgCO2e/kWh": EM_LABEL})
-        title = f"{sector} – Grid CO₂e Intensity ({scenario}, {gwp_mode})"
-        fig = px.line(s_out, x="Year", y=EM_LABEL, title=title)
-        style_emissions_axis(fig)
-        show(fig)
-        st.dataframe(s_out)
-        download_button_for_table(s_out, f"intensity_{sector}_{scenario.replace(' ','_')}_{gwp_mode}_{em_tag}")
-
-    elif chart == "Energy Mix (% stacked bar, every 5 years)":
-        tbl = table_mix_percent_single(data, sector)
-        long = tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name="% of electricity")
-        fig = px.bar(long, x="Year", y="% of electricity", color="Source",
-                     title=f"{sector} – Energy Mix (%) ({scenario}, {gwp_mode})")
-        style_percent_axis(fig, ytitle="% of electricity")
-        show(fig)
-        st.dataframe(tbl.round(2))
-        download_button_for_table(tbl.round(2), f"mix_percent_{sector}_{scenario.replace(' ','_')}_{gwp_mode}")
-
-    elif chart == "Energy Mix (stacked bar, every 5 years)":
-        tbl = table_mix_energy_single(data, sector)
-        long = tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name=ELEC_LABEL)
-        fig = px.bar(long, x="Year", y=ELEC_LABEL, color="Source",
-                     title=f"{sector} – Energy Mix ({ELEC_LABEL}) ({scenario}, {gwp_mode})")
+@st.cache_data(show_spinner=False, max_entries=512)
+def chart_figure(chart_id: str, scenarios: tuple, regions: tuple, gwp: dict, ef_unit: str,
+                 by: str | None, year: int | None, em_scale: float, em_label: str,
+                 title: str, order: tuple, factor_set: str = DEFAULT_FACTOR_SET) -> str:
+    # JSON spec of a standard chart, keyed like chart_data plus its title: reruns that leave
+    # the data alone skip plotly.express, styling and serialization
+    record_cache(False)  # only runs on a st.cache_data miss
+    long, _ = chart_data(chart_id, scenarios, regions, gwp, ef_unit, by, year, em_scale, em_label, factor_set)
+    value = long.columns[-1]
+    category_orders = {by: list(order)} if by else {}
+    facets = {"facet_col": by, "facet_col_wrap": FACET_WRAP} if by and chart_id != "intensity" else {}
+    if chart_id == "intensity":
+        # WebGL traces: one line per region/scenario over 46 years stays cheap to draw
+        fig = px.line(long, x="Year", y=value, color=by, title=title, category_orders=category_orders,
+                      render_mode="webgl")
+    elif chart_id == "emissions_split":
+        fig = px.bar(long, x="Source", y=value, color="Type", barmode="stack", title=title,
+                     category_orders=category_orders, **facets)
+    else:
+        fig = px.bar(long, x="Year", y=value, color="Source", title=title,
+                     category_orders=category_orders, **facets)
+    rows = -(-len(order) // FACET_WRAP) if facets else 1
+    if rows > 1:
+        fig.update_layout(height=FACET_ROW_HEIGHT * rows + 100)
+    if chart_id == "mix_energy":
         style_energy_axis(fig)
-        show(fig)
-        st.dataframe(tbl.round(3))
-        download_button_for_table(tbl.round(3), f"mix_{ELEC_LABEL}_{sector}_{scenario.replace(' ','_')}_{gwp_mode}")
-
-    elif chart == "CO₂e Contribution (stacked bar, every 5 years)":
-        tbl = table_contrib_single(data, sector)
-        long = tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name=EM_LABEL)
-        fig = px.bar(long, x="Year", y=EM_LABEL, color="Source",
-                     title=f"{sector} – CO₂e Contribution ({scenario}, {gwp_mode})")
+    elif chart_id in ("mix_percent", "co2e_share"):
+        style_percent_axis(fig, ytitle=value)
+    else:
         style_emissions_axis(fig)
-        show(fig)
-        st.dataframe(tbl.round(5))
-        download_button_for_table(tbl.round(5), f"contrib_{sector}_{scenario.replace(' ','_')}_{gwp_mode}_{em_tag}")
-
-    elif chart == "CO₂e Share by Source (% stacked bar, every 5 years)":
-        tbl = table_co2e_share_single(data, sector)
-        long = tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name="% of CO₂e")
-        fig = px.bar(long, x="Year", y="% of CO₂e", color="Source",
-                     title=f"{sector} – CO₂e Share by Source ({scenario}, {gwp_mode})")
-        style_percent_axis(fig, ytitle="% of CO₂e")
-        show(fig)
-        st.dataframe(tbl.round(2))
-        download_button_for_table(tbl.round(2), f"co2e_share_{sector}_{scenario.replace(' ','_')}_{gwp_mode}")
+    return pio.to_json(fig, validate=False)
 
-    elif chart == "Emissions by Source (Operating vs Embodied, single year)":
+# =========================
+#      RENDER SECTIONS (with dynamic axes)
+# =========================
+with span(f"render:{compare_mode}:{chart}"):
+    if chart == "Hourly Intensity (heatmap, single year)":
         year = pick_year_control()
-        tbl = table_emissions_split_single_year(data, sector, year)
-        long = tbl.reset_index().melt(id_vars="Source", var_name="Type", value_name=EM_LABEL)
-        fig = px.bar(long, x="Source", y=EM_LABEL, color="Type", barmode="stack",
-                     title=f"{sector} – Emissions by Source ({EM_LABEL}, {year}, {scenario}, {gwp_mode})")
-        style_emissions_axis(fig)
-        show(fig)
-        st.dataframe(tbl.round(6))
-        download_button_for_table(tbl.round(6), f"emissions_split_{sector}_{year}_{scenario.replace(' ','_')}_{gwp_mode}_{em_tag}")
-
-elif compare_mode == "Multi-scenario":
-    # ---------- COMPARE SCENARIOS / SINGLE REGION ----------
-    if chart == "Total Intensity (line)":
-        frames = []
-        for sc in scenario_list:
-            df = _intensity_to_df(data_by_scenario[sc]["grid_intensity"][sector], em_scale)
-            df["Scenario"] = sc
-            frames.append(df)
-        
-        all_df = pd.concat(frames, ignore_index=True).rename(columns={"kgCO2e/kWh": EM_LABEL})
-        title = f"{sector} – Grid CO₂e Intensity by Scenario ({gwp_mode})"
-        fig = px.line(all_df, x="Year", y=EM_LABEL, color="Scenario", title=title)
-        style_emissions_axis(fig)
+        with span("data:hourly"):
+            hourly = hourly_intensity(scenario_path(scenario), gwp, ef_unit, factor_set=factor_set)
+        # one (sector, year) row of the memory-mapped (sector, year, hour) output
+        values = np.asarray(hourly["intensity"][SECTORS.index(sector), years.index(str(year))], dtype=float) * em_scale
+        fig = px.imshow(values.reshape(HOURS // 24, 24).T, origin="lower", aspect="auto",
+                        labels={"x": "Day of year", "y": "Hour of day", "color": EM_LABEL},
+                        title=f"{sector} – Hourly Grid CO₂e Intensity ({year}, {scenario}, {gwp_mode})")
         show(fig)
-        
-        s_out = all_df.pivot(index="Year", columns="Scenario", values=EM_LABEL).reset_index()
-        st.dataframe(s_out)
-        download_button_for_table(s_out, f"intensity_multiscenario_{sector}_{gwp_mode}_{em_tag}")
-    else:
-        st.warning(
-            f"Chart '{chart}' is not supported for Multi-scenario comparison. "
-            "Please select 'Total Intensity (line)' to compare scenarios."
-        )
-        st.stop()
+        if profile_path() is None:
+            st.caption("No hourly profile file in data/ (hourly_profiles.csv or .parquet); hours are flat at the annual intensity.")
 
-elif compare_mode == "Multi-region":
-    # ---------- SINGLE SCENARIO / COMPARE REGIONS ----------
-    frames = []
-    
-    if chart == "Total Intensity (line)":
-        for r in sectors_chosen:
-            df = _intensity_to_df(data["grid_intensity"][r], em_scale)
-            df["Region"] = r
-            frames.append(df)
-        
-        all_df = pd.concat(frames, ignore_index=True).rename(columns={"kgCO2e/kWh": EM_LABEL})
-        title = f"Grid CO₂e Intensity by Region ({scenario}, {gwp_mode})"
-        fig = px.line(all_df, x="Year", y=EM_LABEL, color="Region", title=title)
-        style_emissions_axis(fig)
-        show(fig)
-        
-        s_out = all_df.pivot(index="Year", columns="Region", values=EM_LABEL).reset_index()
-        st.dataframe(s_out)
-        download_button_for_table(s_out, f"intensity_multiregion_{scenario.replace(' ','_')}_{gwp_mode}_{em_tag}")
-
-    elif chart == "Energy Mix (% stacked bar, every 5 years)":
-        for r in sectors_chosen:
-            tbl = table_mix_percent_single(data, r)
-            long = tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name="% of electricity")
-            long["Region"] = r
-            frames.append(long)
-        
-        all_df = pd.concat(frames, ignore_index=True)
-        title = f"Energy Mix (%) by Region ({scenario}, {gwp_mode})"
-        fig = px.bar(all_df, x="Year", y="% of electricity", color="Source", facet_col="Region", title=title)
-        style_percent_axis(fig, ytitle="% of electricity")
-        show(fig)
+        hours = pd.date_range("2001-01-01", periods=HOURS, freq="h")  # non-leap calendar
+        tbl = (pd.DataFrame({"Month": hours.strftime("%b"), "Hour": hours.hour, EM_LABEL: values})
+               .pivot_table(index="Month", columns="Hour", values=EM_LABEL, aggfunc="mean", sort=False))
+        st.dataframe(tbl.round(6))
+        download_button_for_table(tbl.round(6).reset_index(), f"hourly_month_by_hour_{sector}_{year}_{scenario.replace(' ','_')}_{gwp_mode}_{em_tag}")
+
+    elif chart.startswith("Sensitivity"):
+        # ---------- ONE SCENARIO + REGION: which inputs drive intensity ----------
+        s1, s2, s3 = st.columns(3)
+        with s1:
+            year = pick_year_control()
+        with s2:
+            spread = st.slider("Input range (± % around each point estimate)", 5, 50, 20, step=5) / 100.0
+        with s3:
+            top = st.slider("Inputs shown", 5, 30, 15)
+        cell = (SECTORS.index(sector), years.index(str(year)))
+
+        if chart == "Sensitivity – Tornado (one input at a time, single year)":
+            with span("data:tornado", cache=True):
+                res = get_tornado(scenario, gwp, ef_unit, spread, factor_set)
+            point = res["point"][cell]
+            s_out = pd.DataFrame({
+                "Input": res["parameters"],
+                "Group": SENS_GROUPS,
+                "Low": (res["low"][:, cell[0], cell[1]] - point) * em_scale,
+                "High": (res["high"][:, cell[0], cell[1]] - point) * em_scale,
+            })
+            s_out["Swing"] = (s_out["High"] - s_out["Low"]).abs()
+            s_out = s_out.sort_values("Swing", ascending=False, kind="stable").head(top).reset_index(drop=True)
+            long = s_out.melt(id_vars="Input", value_vars=["Low", "High"], var_name="Bound", value_name=EM_LABEL)
+            title = (f"{sector} – Intensity Change at -/+{spread:.0%} per Input ({year}, {scenario}, {gwp_mode}; "
+                     f"point {point * em_scale:.4g} {EM_LABEL})")
+            fig = px.bar(long, x=EM_LABEL, y="Input", color="Bound", orientation="h", barmode="overlay", title=title,
+                         category_orders={"Input": list(s_out["Input"])})
+            fig.update_layout(height=max(400, 28 * len(s_out) + 150))
+            show(fig)
+            s_out = s_out.round(8)
+            st.dataframe(s_out, hide_index=True)
+            download_button_for_table(s_out, f"tornado_{sector}_{year}_{scenario.replace(' ','_')}_{gwp_mode}_{em_tag}")
+        else:
+            n = st.select_slider("Base samples (runs = samples × (inputs + 2))", [256, 512, 1024, 2048, 4096], value=1024)
+            with span("data:sobol", cache=True):
+                res = get_sobol(scenario, gwp, ef_unit, spread, n, factor_set)
+            s_out = pd.DataFrame({
+                "Input": res["parameters"],
+                "Group": SENS_GROUPS,
+                "First-order": res["first"][:, cell[0], cell[1]],
+                "Total": res["total"][:, cell[0], cell[1]],
+            })
+            s_out = s_out.sort_values("Total", ascending=False, kind="stable").head(top).reset_index(drop=True)
+            long = s_out.melt(id_vars="Input", value_vars=["First-order", "Total"], var_name="Index", value_name="Sobol index")
+            title = f"{sector} – Sobol Indices of Grid Intensity ({year}, {scenario}, {gwp_mode}; {res['n_runs']:,} runs)"
+            fig = px.bar(long, x="Sobol index", y="Input", color="Index", orientation="h", barmode="group", title=title,
+                         category_orders={"Input": list(s_out["Input"])})
+            fig.update_layout(height=max(400, 28 * len(s_out) + 150))
+            show(fig)
+            s_out = s_out.round(4)
+            st.dataframe(s_out, hide_index=True)
+            download_button_for_table(s_out, f"sobol_{sector}_{year}_{scenario.replace(' ','_')}_{gwp_mode}_n{n}")
+        st.caption("Every input is scaled uniformly within the range above: operating factors, source split "
+                   "weights, embodied factors and solar/wind capacity factors. Sobol indices near zero are within "
+                   "sampling noise; raise the sample count to tighten them.")
+
+    elif compare_mode == "Carbon budget":
+        # ---------- ALL SCENARIOS x REGIONS: cumulative tonnes against a budget ----------
+        with span("data:cumulative", cache=True):
+            cum = get_cumulative(tuple(scenario_names), gwp, ef_unit, budget_start, factor_set)
+        budget_view(cum, sector, budget_start, gwp_mode)
+
+    elif compare_mode == "Scenario delta":
+        # ---------- TWO SCENARIOS / SINGLE REGION: LMDI attribution of the intensity change ----------
+        if chart == "Intensity Change Attribution (mix vs factor, every 5 years)":
+            long = attribution_long(attr, [sector], years[::5], em_scale, EM_LABEL)
+            title = f"{sector} – Intensity Change, {scenario} vs {base_label} ({gwp_mode})"
+            fig = px.bar(long, x="Year", y=EM_LABEL, color="Source", facet_col="Effect", title=title)
+            style_emissions_axis(fig)
+            show(fig)
+
+            s_out = long.pivot_table(index=["Effect", "Source"], columns="Year", values=EM_LABEL, observed=True)
+            i = SECTORS.index(sector)
+            y_idx = [years.index(y) for y in years[::5]]
+            s_out.loc[("Total", "Baseline intensity"), :] = attr["base"][i, y_idx] * em_scale
+            s_out.loc[("Total", "Compared intensity"), :] = attr["other"][i, y_idx] * em_scale
+            s_out.loc[("Total", "Change"), :] = attr["delta"][i, y_idx] * em_scale
+            s_out = s_out.round(6)
+            st.dataframe(s_out)
+            download_button_for_table(s_out.reset_index(), f"attribution_{sector}_{scenario.replace(' ','_')}_vs_{base_label.replace(' ','_').replace(',','')}_{gwp_mode}_{em_tag}")
+
+        elif chart == "Intensity Change Attribution (mix vs factor, single year)":
+            year = pick_year_control()
+            long = attribution_long(attr, [sector], [year], em_scale, EM_LABEL)
+            title = f"{sector} – Intensity Change by Source ({year}), {scenario} vs {base_label} ({gwp_mode})"
+            fig = px.bar(long, x="Source", y=EM_LABEL, color="Effect", barmode="relative", title=title)
+            style_emissions_axis(fig)
+            show(fig)
+
+            s_out = long.pivot_table(index="Source", columns="Effect", values=EM_LABEL, observed=True)
+            s_out["Total"] = s_out.sum(axis=1)
+            s_out = s_out.round(6)
+            st.dataframe(s_out)
+            download_button_for_table(s_out.reset_index(), f"attribution_{sector}_{year}_{scenario.replace(' ','_')}_vs_{base_label.replace(' ','_').replace(',','')}_{gwp_mode}_{em_tag}")
 
-        s_out = all_df.pivot_table(index=["Region", "Source"], columns="Year", values="% of electricity").round(2)
-        st.dataframe(s_out)
-        download_button_for_table(s_out.reset_index(), f"mix_percent_multiregion_{scenario.replace(' ','_')}_{gwp_mode}")
-
-    elif chart == "Energy Mix (stacked bar, every 5 years)":
-        for r in sectors_chosen:
-            tbl = table_mix_energy_single(data, r)
-            long = tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name=ELEC_LABEL)
-            long["Region"] = r
-            frames.append(long)
-        
-        all_df = pd.concat(frames, ignore_index=True)
-        title = f"Energy Mix ({ELEC_LABEL}) by Region ({scenario}, {gwp_mode})"
-        fig = px.bar(all_df, x="Year", y=ELEC_LABEL, color="Source", facet_col="Region", title=title)
-        style_energy_axis(fig)
-        show(fig)
-        
-        s_out = all_df.pivot_table(index=["Region", "Source"], columns="Year", values=ELEC_LABEL).round(3)
-        st.dataframe(s_out)
-        download_button_for_table(s_out.reset_index(), f"mix_{ELEC_LABEL}_multiregion_{scenario.replace(' ','_')}_{gwp_mode}")
-
-    elif chart == "CO₂e Contribution (stacked bar, every 5 years)":
-        for r in sectors_chosen:
-            tbl = table_contrib_single(data, r)
-            long = tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name=EM_LABEL)
-            long["Region"] = r
-            frames.append(long)
-
-        all_df = pd.concat(frames, ignore_index=True)
-        title = f"CO₂e Contribution by Region ({scenario}, {gwp_mode})"
-        fig = px.bar(all_df, x="Year", y=EM_LABEL, color="Source", facet_col="Region", title=title)
-        style_emissions_axis(fig)
-        show(fig)
-        
-        s_out = all_df.pivot_table(index=["Region", "Source"], columns="Year", values=EM_LABEL).round(5)
-        st.dataframe(s_out)
-        download_button_for_table(s_out.reset_index(), f"contrib_multiregion_{scenario.replace(' ','_')}_{gwp_mode}_{em_tag}")
-
-    elif chart == "CO₂e Share by Source (% stacked bar, every 5 years)":
-        for r in sectors_chosen:
-            tbl = table_co2e_share_single(data, r)
-            long = tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name="% of CO₂e")
-            long["Region"] = r
-            frames.append(long)
-        
-        all_df = pd.concat(frames, ignore_index=True)
-        title = f"CO₂e Share by Source (%) by Region ({scenario}, {gwp_mode})"
-        fig = px.bar(all_df, x="Year", y="% of CO₂e", color="Source", facet_col="Region", title=title)
-        style_percent_axis(fig, ytitle="% of CO₂e")
-        show(fig)
-        
-        s_out = all_df.pivot_table(index=["Region", "Source"], columns="Year", values="% of CO₂e").round(2)
-        st.dataframe(s_out)
-        download_button_for_table(s_out.reset_index(), f"co2e_share_multiregion_{scenario.replace(' ','_')}_{gwp_mode}")
+    else:
+        # ---------- ONE SCENARIO + REGION, or faceted/coloured by scenario or region ----------
+        chart_id = CHART_IDS[chart]
+        by = {"None": None, "Multi-scenario": "Scenario", "Multi-region": "Region"}[compare_mode]
+        if compare_mode == "Multi-scenario":
+            scenarios, regions, order = tuple(scenario_list), (sector,), scenario_list
+            where = f"multiscenario_{sector}"
+        elif compare_mode == "Multi-region":
+            scenarios, regions, order = (scenario,), tuple(sectors_chosen), sectors_chosen
+            where = f"multiregion_{scenario.replace(' ', '_')}"
+        else:
+            scenarios, regions, order = (scenario,), (sector,), []
+            where = f"{sector}_{scenario.replace(' ', '_')}"
+        year = pick_year_control() if chart_id == "emissions_split" else None
+        with span("tables", cache=True):
+            _, tbl = chart_data(chart_id, scenarios, regions, gwp, ef_unit, by, year, em_scale, EM_LABEL, factor_set)
+
+        name = {
+            "intensity": "Grid CO₂e Intensity",
+            "mix_percent": "Energy Mix (%)",
+            "mix_energy": f"Energy Mix ({ELEC_LABEL})",
+            "contrib": "CO₂e Contribution",
+            "co2e_share": "CO₂e Share by Source",
+            "emissions_split": f"Emissions by Source ({EM_LABEL}, {year})",
+        }[chart_id]
+        if compare_mode == "Multi-scenario":
+            title = f"{sector} – {name} by Scenario ({gwp_mode})"
+        elif compare_mode == "Multi-region":
+            title = f"{name} by Region ({scenario}, {gwp_mode})"
+        else:
+            title = f"{sector} – {name} ({scenario}, {gwp_mode})"
+
+        with span("figure", cache=True):
+            spec = chart_figure(chart_id, scenarios, regions, gwp, ef_unit, by, year, em_scale, EM_LABEL,
+                                title, tuple(order), factor_set)
+        show(spec)
+        st.dataframe(tbl)
+
+        prefix = f"mix_{ELEC_LABEL}" if chart_id == "mix_energy" else chart_id
+        parts = [prefix, where] + ([str(year)] if year else []) + [gwp_mode]
+        if chart_id in ("intensity", "contrib", "emissions_split"):
+            parts.append(em_tag)
+        download_button_for_table(tbl if tbl.index.names == [None] else tbl.reset_index(), "_".join(parts))
 
-    elif chart == "Emissions by Source (Operating vs Embodied, single year)":
-        year = pick_year_control()
-        for r in sectors_chosen:
-            tbl = table_emissions_split_single_year(data, r, year)
-            long = tbl.reset_index().melt(id_vars="Source", var_name="Type", value_name=EM_LABEL)
-            long["Region"] = r
-            frames.append(long)
-        
-        all_df = pd.concat(frames, ignore_index=True)
-        title = f"Emissions by Source ({EM_LABEL}, {year}) by Region ({scenario}, {gwp_mode})"
-        fig = px.bar(all_df, x="Source", y=EM_LABEL, color="Type", barmode="stack", facet_col="Region", title=title)
-        style_emissions_axis(fig)
-        show(fig)
-        
-        s_out = all_df.pivot_table(index=["Region", "Source"], columns="Type", values=EM_LABEL).round(6)
-        st.dataframe(s_out)
-        download_button_for_table(s_out.reset_index(), f"emissions_split_multiregion_{year}_{scenario.replace(' ','_')}_{gwp_mode}_{em_tag}")
+# =========================
+#   BULK EXPORT (background)
+# =========================
+@st.cache_resource(show_spinner=False)
+def export_pool() -> ThreadPoolExecutor:
+    # One background writer per server process; bundles queue behind each other
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="cangrid-bundle")
+
+@st.fragment(run_every=1.0)
+def bundle_status():
+    job = st.session_state.get("bundle_job")
+    if job is None:
+        return
+    fut = job["future"]
+    if not fut.done():
+        done, total = job["progress"]
+        st.progress(done / total, text=f"Building bundle… {done}/{total} tables")
+    elif fut.exception() is not None:
+        st.error(f"Bundle failed: {fut.exception()}")
+    else:
+        path = job["path"]
+        st.download_button(
+            label=f"⬇️ Download {job['file_name']}",
+            data=lambda: path.read_bytes(),
+            file_name=job["file_name"],
+            mime=BUNDLE_FORMATS[job["fmt"]][1],
+            width="stretch",
+            key=f"dl-bundle-{path.name}",
+        )
 
+with st.expander("📦 Download everything for this selection"):
+    if compare_mode == "Multi-scenario":
+        bundle_scenarios, bundle_regions = list(scenario_list), [sector]
+    elif compare_mode == "Multi-region":
+        bundle_scenarios, bundle_regions = [scenario], list(sectors_chosen)
+    elif compare_mode == "Scenario delta":
+        bundle_scenarios, bundle_regions = list(dict.fromkeys([base_scenario, scenario])), [sector]
+    elif compare_mode == "Carbon budget":
+        bundle_scenarios, bundle_regions = list(scenario_names), [sector]
+    else:
+        bundle_scenarios, bundle_regions = [scenario], [sector]
+    e1, e2 = st.columns([2, 1])
+    with e1:
+        bundle_fmt = st.radio("Format", list(BUNDLE_FORMATS), format_func=lambda f: BUNDLE_FORMATS[f][2], horizontal=True)
+    with e2:
+        all_regions = st.checkbox("All regions", value=False)
+    if all_regions:
+        bundle_regions = list(SECTORS)
+    st.caption(f"Intensity, energy mix, CO₂e and operating/embodied tables for {', '.join(bundle_scenarios)} × "
+               f"{'all regions' if all_regions else ', '.join(bundle_regions)}, all years ({gwp_mode}, {ef_unit} inputs, {factor_set} factors).")
+    if st.button("Build bundle", key="build-bundle"):
+        path = bundle_path(bundle_fmt)
+        job = {"progress": (0, len(bundle_scenarios) * len(BUNDLE_TABLES)), "path": path, "fmt": bundle_fmt,
+               "file_name": f"cangrid_{len(bundle_scenarios)}scenarios_{len(bundle_regions)}regions_{gwp_mode}_{em_tag}.{path.suffix[1:]}"}
+        def _progress(done, total, job=job):
+            job["progress"] = (done, total)
+        job["future"] = export_pool().submit(write_bundle, path, bundle_fmt, bundle_scenarios, bundle_regions,
+                                             dict(gwp), ef_unit, progress=_progress, factor_set=factor_set)
+        st.session_state["bundle_job"] = job
+    bundle_status()
+
+if instrument.ENABLED:
+    with st.sidebar.expander("⏱ Stage timings (CANGRID_PROFILE)", expanded=False):
+        recs = instrument.records()
+        if recs:
+            st.dataframe(pd.DataFrame(recs)[["span", "ms", "peak_mb", "cache"]], hide_index=True)
+        st.caption("Also appended as JSON lines to CANGRID_PROFILE_LOG (default .cache/profile/spans.jsonl).")
 
 st.markdown("---")
 st.markdown(
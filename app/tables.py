@@ -0,0 +1,128 @@
+# app/tables.py
+"""
+Display-table builders for the dashboard (unit-aware), kept free of Streamlit so they can
+be reused by exports and benchmarks. `data_dict` is a compute_structures result; every
+builder is a slice and/or pivot of its long-form `table` (see grid_core.result_table).
+"""
+import numpy as np
+import pandas as pd
+
+ELEC_DIV = 1e9  # kWh -> TWh
+DEFAULT_EM_LABEL = "kg CO₂e/kWh"
+
+def select(data_dict, regions=None, years=None, columns=()) -> pd.DataFrame:
+    """Key columns plus `columns` for the given regions/years (None = all)."""
+    t = data_dict["table"]
+    mask = np.ones(len(t), dtype=bool)
+    if regions is not None:
+        mask &= t["Region"].isin(list(regions)).to_numpy()
+    if years is not None:
+        mask &= t["Year"].isin([int(y) for y in years]).to_numpy()
+    return t.loc[mask, ["Scenario", "Region", "Year", "Source", *columns]]
+
+def long_by_year(data_dict, regions, column: str, value_name: str, step=5, scale: float = 1.0) -> pd.DataFrame:
+    """Region/Year/Source/value rows for every `step`-th year, Year as a string label."""
+    sub = select(data_dict, regions, data_dict["years"][::step], [column])
+    return pd.DataFrame({
+        "Scenario": sub["Scenario"].array,
+        "Region": sub["Region"].array,
+        "Year": sub["Year"].astype(str).to_numpy(),
+        "Source": sub["Source"].array,
+        value_name: sub[column].to_numpy(dtype=float) * scale,
+    })
+
+def _region_block(data_dict, sector: str, columns, years) -> np.ndarray:
+    """(len(years), source, len(columns)) values of one region, read straight from the table's
+    SECTORS x YEARS x NEW_INDEX row order."""
+    t = data_dict["table"]
+    n_y, n_k = len(data_dict["years"]), len(t["Source"].cat.categories)
+    start = t["Region"].cat.categories.get_loc(sector) * n_y * n_k
+    rows = t.iloc[start:start + n_y * n_k]
+    block = rows[list(columns)].to_numpy(dtype=float).reshape(n_y, n_k, len(columns))
+    return block[[data_dict["years"].index(str(y)) for y in years]]
+
+def _by_source(data_dict, values: np.ndarray, columns) -> pd.DataFrame:
+    index = pd.Index(data_dict["table"]["Source"].cat.categories, name="Source")
+    return pd.DataFrame(values, index=index, columns=list(columns))
+
+def _by_year(data_dict, sector: str, column: str, step: int, scale: float) -> pd.DataFrame:
+    years = data_dict["years"][::step]
+    return _by_source(data_dict, _region_block(data_dict, sector, [column], years)[:, :, 0].T * scale, years)
+
+def table_mix_percent_single(data_dict, sector: str, step=5):
+    return _by_year(data_dict, sector, "% of electricity", step, 100.0)
+
+def table_mix_energy_single(data_dict, sector: str, step=5, elec_div: float = ELEC_DIV):
+    # Base column is kWh; convert to fixed TWh
+    return _by_year(data_dict, sector, "kWh", step, 1.0 / elec_div)
+
+def table_contrib_single(data_dict, sector: str, step=5, em_scale: float = 1.0):
+    return _by_year(data_dict, sector, "Grid_Intensity_Contribution", step, em_scale)
+
+def table_co2e_share_single(data_dict, sector: str, step=5):
+    return _by_year(data_dict, sector, "% of CO2", step, 100.0)
+
+def emissions_split_long(data_dict, regions, year: int,
+                         em_scale: float = 1.0, em_label: str = DEFAULT_EM_LABEL) -> pd.DataFrame:
+    """Scenario/Region/Source/Type rows of operating and embodied factors in one year."""
+    sub = select(data_dict, regions, [year], ["Operating kgCO2/kWh", "Embodied kgCO2/kWh"])
+    sub = sub.rename(columns={"Operating kgCO2/kWh": f"Operating {em_label}",
+                              "Embodied kgCO2/kWh": f"Embodied {em_label}"})
+    long = sub.drop(columns="Year").melt(id_vars=["Scenario", "Region", "Source"], var_name="Type", value_name=em_label)
+    long[em_label] *= em_scale
+    return long
+
+def table_emissions_split_single_year(data_dict, sector: str, year: int,
+                                      em_scale: float = 1.0, em_label: str = DEFAULT_EM_LABEL):
+    values = _region_block(data_dict, sector, ["Operating kgCO2/kWh", "Embodied kgCO2/kWh"], [year])[0]
+    return _by_source(data_dict, values * em_scale, [f"Operating {em_label}", f"Embodied {em_label}"])
+
+def intensity_long(data_dict, regions, scale: float, value_name: str = "kgCO2e/kWh") -> pd.DataFrame:
+    """Scenario/Region/Year/intensity rows: the per-source contributions summed over sources."""
+    sub = select(data_dict, regions, columns=["Grid_Intensity_Contribution"])
+    out = (sub.groupby(["Scenario", "Region", "Year"], observed=True, sort=False)["Grid_Intensity_Contribution"]
+           .sum().mul(scale).rename(value_name).reset_index())
+    out["Year"] = out["Year"].astype(str)
+    return out
+
+# ---------- Figure + display-table frames per dashboard chart ----------
+CHARTS = ["intensity", "mix_percent", "mix_energy", "contrib", "co2e_share", "emissions_split"]
+
+def chart_frames(data_dict, chart: str, regions, by: str | None = None, year: int | None = None,
+                 em_scale: float = 1.0, em_label: str = DEFAULT_EM_LABEL,
+                 elec_label: str = "TWh", elec_div: float = ELEC_DIV) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (long, table) for one dashboard chart: the long frame behind the figure and the rounded
+    display table. by=None is a single scenario and region; by="Region" or "Scenario" facets
+    or colours by that dimension (data_dict then holds several regions or scenarios).
+    """
+    regions = list(regions)
+    if chart == "intensity":
+        long = intensity_long(data_dict, regions, em_scale, em_label)
+        if by is None:
+            long = long[["Year", em_label]]
+            return long, long
+        long[by] = long[by].astype(str)
+        order = regions if by == "Region" else data_dict["scenarios"]
+        return long, long.pivot(index="Year", columns=by, values=em_label)[order].reset_index()
+
+    if chart == "emissions_split":
+        if by is None:
+            tbl = table_emissions_split_single_year(data_dict, regions[0], year, em_scale, em_label)
+            return tbl.reset_index().melt(id_vars="Source", var_name="Type", value_name=em_label), tbl.round(6)
+        long = emissions_split_long(data_dict, regions, year, em_scale, em_label)
+        long[[by, "Source"]] = long[[by, "Source"]].astype(str)
+        return long, long.pivot_table(index=[by, "Source"], columns="Type", values=em_label).round(6)
+
+    # table column, display value name, scale, display rounding
+    column, value_name, scale, digits = {
+        "mix_percent": ("% of electricity", "% of electricity", 100.0, 2),
+        "mix_energy": ("kWh", elec_label, 1.0 / elec_div, 3),
+        "contrib": ("Grid_Intensity_Contribution", em_label, em_scale, 5),
+        "co2e_share": ("% of CO2", "% of CO₂e", 100.0, 2),
+    }[chart]
+    if by is None:
+        tbl = _by_year(data_dict, regions[0], column, 5, scale)
+        return tbl.reset_index().melt(id_vars="Source", var_name="Year", value_name=value_name), tbl.round(digits)
+    long = long_by_year(data_dict, regions, column, value_name, scale=scale)
+    return long, long.pivot_table(index=[by, "Source"], columns="Year", values=value_name).round(digits)
@@ -0,0 +1,230 @@
+# app/uncertainty.py
+"""
+Monte Carlo uncertainty bands for grid intensity.
+
+Operating factors (every technology x gas value of the factor set) are drawn lognormally around their
+point estimates, and the solar/wind capacity factors behind the embodied terms likewise.
+Draws are evaluated in vectorized chunks and folded into fixed-size per-cell histograms
+and moments, so memory does not grow with the number of draws. Draws come in blocks of
+DRAW_BLOCK, each seeded from its index, so results do not depend on the chunk size or on
+how many worker processes are used.
+
+    python app/uncertainty.py --scenarios "2023 Current" --draws 100000 --out bands.csv
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from grid_core import (
+    AESO_SCENARIO, DEFAULT_FACTOR_SET, GWP_PRESETS, SECTORS, TRANSMISSION_EFFICIENCY, YEARS,
+    _gwp_matrix, _safe_div, _to_kg_factor, breakdown_parameters, discover_factor_sets, embodied_matrix,
+    get_params, ingest_workbook, mixing_tensor, proc_matrix, scenario_path, scenarios,
+)
+
+DRAW_BLOCK = 1_000     # draws per independently seeded block; chunks are whole blocks
+PILOT_DRAWS = 5_000    # draws that set the histogram range
+
+def _model_inputs(xlsx_path, gwp, emission_input_unit, aeso_scenario, factor_set) -> dict:
+    """Everything a chunk needs, reduced as far as the sampled quantities allow."""
+    breakdown = breakdown_parameters()
+    p = get_params()
+    gen = ingest_workbook(xlsx_path)
+    share = _safe_div(gen, gen.sum(axis=2, keepdims=True))                  # (S, Y, K)
+    return {
+        "share": share,
+        # share-weighted technology mix: operating intensity = tech_weight @ per-tech CO2e
+        "tech_weight": np.einsum('syk,sykt->syt', share, mixing_tensor(breakdown, aeso_scenario)),
+        "proc": proc_matrix(factor_set) * _to_kg_factor(emission_input_unit) / TRANSMISSION_EFFICIENCY,
+        "gwp": _gwp_matrix(gwp)[0],
+        "mass_to_kg": _to_kg_factor(emission_input_unit),
+        "breakdown": breakdown,
+        "factor_set": factor_set,
+        "solar_cf": p['solar_breakdown']['cf'].loc[SECTORS].to_numpy(dtype=float),
+        "wind_cf": p['wind_breakdown']['cf to 5%'].loc[SECTORS].to_numpy(dtype=float),
+    }
+
+def _noise(inputs: dict, n: int, rng: np.random.Generator, sigma: float, cf_sigma: float) -> tuple[np.ndarray, ...]:
+    """Multiplicative lognormal noise on the operating factors and the solar / wind capacity factors."""
+    n_s = len(inputs["solar_cf"])
+    return (rng.lognormal(0.0, sigma, size=(n,) + inputs["proc"].shape),
+            rng.lognormal(0.0, cf_sigma, size=(n, n_s)),
+            rng.lognormal(0.0, cf_sigma, size=(n, n_s)))
+
+def _evaluate(inputs: dict, proc_noise: np.ndarray, solar_noise: np.ndarray, wind_noise: np.ndarray) -> np.ndarray:
+    n = len(proc_noise)
+    tech_co2e = (inputs["proc"] * proc_noise) @ inputs["gwp"]              # (n, T)
+    n_s, n_y, n_t = inputs["tech_weight"].shape
+    operating = (tech_co2e @ inputs["tech_weight"].reshape(-1, n_t).T).reshape(n, n_s, n_y)
+
+    solar_cf = np.minimum(inputs["solar_cf"] * solar_noise, 1.0)
+    wind_cf = np.minimum(inputs["wind_cf"] * wind_noise, 1.0)
+    emb = embodied_matrix(inputs["breakdown"], solar_cf, wind_cf, inputs["factor_set"]) * inputs["mass_to_kg"]  # (n, S, K)
+    embodied = np.matmul(emb.transpose(1, 0, 2), inputs["share"].transpose(0, 2, 1)).transpose(1, 0, 2)
+    return operating + embodied
+
+def sample_intensity(inputs: dict, n: int, rng: np.random.Generator,
+                     sigma: float, cf_sigma: float) -> np.ndarray:
+    """n intensity draws, kg CO2e/kWh, shaped (n, sector, year)."""
+    return _evaluate(inputs, *_noise(inputs, n, rng, sigma, cf_sigma))
+
+def block_draws(inputs: dict, blocks: list[tuple[int, int]], seed: int, sigma: float, cf_sigma: float) -> np.ndarray:
+    """The intensity draws of the given (block_index, size) blocks, evaluated in one vectorized call."""
+    noise = [_noise(inputs, size, np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(idx,))),
+                    sigma, cf_sigma) for idx, size in blocks]
+    return _evaluate(inputs, *(np.concatenate(parts) for parts in zip(*noise)))
+
+def _run_chunks(inputs: dict, chunks: list[list[tuple[int, int]]], seed: int, sigma: float, cf_sigma: float,
+                width: np.ndarray, bins: int) -> dict:
+    """Fold the given chunks (lists of (block_index, size)) into histogram counts and shifted moments."""
+    n_cells = width.size
+    counts = np.zeros(n_cells * bins, dtype=np.int64)
+    s1 = np.zeros(n_cells)
+    s2 = np.zeros(n_cells)
+    lo = np.full(n_cells, np.inf)
+    hi = np.full(n_cells, -np.inf)
+    cell_offset = np.arange(n_cells) * bins
+    for blocks in chunks:
+        size = sum(n for _, n in blocks)
+        x = block_draws(inputs, blocks, seed, sigma, cf_sigma).reshape(size, n_cells)
+        b = np.clip((x / width).astype(np.int64), 0, bins - 1)
+        counts += np.bincount((b + cell_offset).ravel(), minlength=n_cells * bins)
+        d = x - inputs["point"]
+        s1 += d.sum(axis=0)
+        s2 += (d * d).sum(axis=0)
+        lo = np.minimum(lo, x.min(axis=0))
+        hi = np.maximum(hi, x.max(axis=0))
+    return {"counts": counts, "s1": s1, "s2": s2, "min": lo, "max": hi}
+
+def _hist_percentiles(counts: np.ndarray, width: np.ndarray, n: int, qs) -> dict[float, np.ndarray]:
+    cum = np.cumsum(counts, axis=1)
+    rows = np.arange(counts.shape[0])
+    out = {}
+    for q in qs:
+        target = q / 100.0 * n
+        idx = np.minimum((cum < target).sum(axis=1), counts.shape[1] - 1)
+        prev = np.where(idx > 0, cum[rows, np.maximum(idx - 1, 0)], 0)
+        frac = _safe_div(target - prev, counts[rows, idx].astype(float))
+        out[q] = (idx + np.clip(frac, 0.0, 1.0)) * width
+    return out
+
+def monte_carlo_intensity(
+    xlsx_path: Path,
+    gwp: dict[str, float],
+    n_draws: int = 10_000,
+    sigma: float = 0.2,
+    cf_sigma: float = 0.1,
+    percentiles=(5, 50, 95),
+    chunk_size: int = 5_000,
+    bins: int = 2048,
+    workers: int | None = None,
+    seed: int = 0,
+    emission_input_unit: str = "kg",
+    aeso_scenario: str = AESO_SCENARIO,
+    factor_set: str = DEFAULT_FACTOR_SET,
+) -> dict:
+    """
+    Percentile bands of grid intensity per sector and year.
+
+    sigma / cf_sigma: log-space standard deviations of the multiplicative noise on the operating
+    factors and on the solar/wind capacity factors (medians stay at the point estimates).
+    Percentiles come from per-cell histograms spanning [0, 2 x max of a PILOT_DRAWS pilot]
+    (values beyond land in the top bin), clipped to the observed min/max, so their
+    resolution is about max / bins. chunk_size is rounded down to whole DRAW_BLOCKs (at
+    least one); workers > 1 spreads chunks over a process pool. Neither changes the result.
+
+    Returns 'percentiles' {q: (sector, year)}, 'mean', 'std', 'min', 'max', 'point'
+    (deterministic intensity) and 'n_draws'; arrays follow SECTORS x YEARS.
+    """
+    inputs = _model_inputs(xlsx_path, gwp, emission_input_unit, aeso_scenario, factor_set)
+    inputs["point"] = (
+        np.einsum('syt,t->sy', inputs["tech_weight"], inputs["proc"] @ inputs["gwp"])
+        + (inputs["share"] * embodied_matrix(inputs["breakdown"], factor_set=factor_set)[:, None, :] * inputs["mass_to_kg"]).sum(axis=2)
+    ).ravel()
+    shape = (len(SECTORS), len(YEARS))
+
+    pilot = sample_intensity(inputs, min(PILOT_DRAWS, n_draws), np.random.default_rng(seed), sigma, cf_sigma)
+    upper = 2.0 * pilot.reshape(pilot.shape[0], -1).max(axis=0)
+    width = np.where(upper > 0, upper, 1.0) / bins
+
+    blocks = [(i, min(DRAW_BLOCK, n_draws - start)) for i, start in enumerate(range(0, n_draws, DRAW_BLOCK))]
+    per_chunk = max(chunk_size // DRAW_BLOCK, 1)
+    chunks = [blocks[i:i + per_chunk] for i in range(0, len(blocks), per_chunk)]
+    if workers and workers > 1 and len(chunks) > 1:
+        groups = [chunks[w::workers] for w in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_chunks, *zip(*[
+                (inputs, g, seed, sigma, cf_sigma, width, bins) for g in groups if g
+            ])))
+    else:
+        parts = [_run_chunks(inputs, chunks, seed, sigma, cf_sigma, width, bins)]
+
+    counts = sum(p["counts"] for p in parts).reshape(-1, bins)
+    s1 = sum(p["s1"] for p in parts)
+    s2 = sum(p["s2"] for p in parts)
+    lo = np.min([p["min"] for p in parts], axis=0)
+    hi = np.max([p["max"] for p in parts], axis=0)
+    mean_shift = s1 / n_draws
+    var = np.maximum(s2 / n_draws - mean_shift ** 2, 0.0) * n_draws / max(n_draws - 1, 1)
+
+    bands = _hist_percentiles(counts, width, n_draws, percentiles)
+    return {
+        "percentiles": {q: np.clip(v, lo, hi).reshape(shape) for q, v in bands.items()},
+        "mean": (inputs["point"] + mean_shift).reshape(shape),
+        "std": np.sqrt(var).reshape(shape),
+        "min": lo.reshape(shape),
+        "max": hi.reshape(shape),
+        "point": inputs["point"].reshape(shape),
+        "n_draws": n_draws,
+    }
+
+def bands_table(result: dict, scenario: str) -> pd.DataFrame:
+    """A monte_carlo_intensity result as one row per region and year."""
+    n_s, n_y = result["point"].shape
+    df = pd.DataFrame({
+        "Scenario": scenario,
+        "Region": np.repeat(SECTORS, n_y),
+        "Year": np.tile(np.array(YEARS, dtype=int), n_s),
+        "point": result["point"].ravel(),
+        "mean": result["mean"].ravel(),
+        "std": result["std"].ravel(),
+    })
+    for q, v in result["percentiles"].items():
+        df[f"p{q:g}"] = v.ravel()
+    return df
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Monte Carlo percentile bands of grid intensity per region and year (CSV).")
+    ap.add_argument("--scenarios", nargs="+", default=scenarios(), choices=scenarios(), metavar="SCENARIO")
+    ap.add_argument("--gwp", default="AR6", choices=list(GWP_PRESETS))
+    ap.add_argument("--unit", default="kg", choices=["kg", "g"], help="model input unit for emission factors")
+    ap.add_argument("--factor-set", default=DEFAULT_FACTOR_SET, choices=list(discover_factor_sets()),
+                    help=f"emission-factor set under data/factor_sets/ (default: {DEFAULT_FACTOR_SET})")
+    ap.add_argument("--draws", type=int, default=10_000)
+    ap.add_argument("--sigma", type=float, default=0.2, help="log-space sd of the operating-factor noise")
+    ap.add_argument("--cf-sigma", type=float, default=0.1, help="log-space sd of the solar/wind cf noise")
+    ap.add_argument("--percentiles", type=float, nargs="+", default=[5, 50, 95])
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: in-process)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=Path("uncertainty_bands.csv"))
+    args = ap.parse_args(argv)
+
+    frames = []
+    for sc in args.scenarios:
+        t0 = time.perf_counter()
+        res = monte_carlo_intensity(scenario_path(sc), GWP_PRESETS[args.gwp], n_draws=args.draws, sigma=args.sigma,
+                                    cf_sigma=args.cf_sigma, percentiles=tuple(args.percentiles), workers=args.workers,
+                                    seed=args.seed, emission_input_unit=args.unit, factor_set=args.factor_set)
+        frames.append(bands_table(res, sc))
+        print(f"{sc}: {args.draws:,} draws ({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+    pd.concat(frames, ignore_index=True).to_csv(args.out, index=False)
+    print(f"Wrote {args.out}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
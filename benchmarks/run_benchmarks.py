@@ -0,0 +1,203 @@
+"""
+Benchmarks for the model and dashboard hot paths, on the fixed inputs in data/.
+
+    python benchmarks/run_benchmarks.py                      # run, save JSON, check thresholds
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<older>.json
+    python benchmarks/run_benchmarks.py --only compute_structures
+
+Each case reports min/median wall time over --repeat runs. Results are written to
+benchmarks/results/<UTC timestamp>.json; the exit code is 1 if any case's median exceeds
+its limit in benchmarks/thresholds.json. Caches are pointed at a fresh temporary
+directory, so "cold" cases really miss the on-disk caches.
+"""
+from __future__ import annotations
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+APP = ROOT / "app"
+
+# Must be set before grid_core / breakdown_params are imported
+os.environ["CANGRID_CACHE_DIR"] = tempfile.mkdtemp(prefix="cangrid-bench-")
+atexit.register(shutil.rmtree, os.environ["CANGRID_CACHE_DIR"], ignore_errors=True)
+sys.path[:0] = [str(APP), str(ROOT)]
+
+BENCH_SCENARIO = "2023 Current"
+IMPORT_MODULES = ["grid_core", "specific_breakdowns", "AESO_Data_Extract", "IESO_Data_Extract"]
+
+def _timeit(fn, repeat: int, setup=None) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+def _run_python(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True,
+                          env={**os.environ, "PYTHONPATH": os.pathsep.join([str(APP), str(ROOT)])})
+
+def _import_times(module: str, repeat: int) -> list[float]:
+    """Wall time of `import module` in a fresh interpreter, minus bare interpreter startup."""
+    def run(code: str) -> float:
+        t0 = time.perf_counter()
+        _run_python(code)
+        return time.perf_counter() - t0
+    base = min(run("pass") for _ in range(2))
+    return [max(run(f"import {module}") - base, 0.0) for _ in range(repeat)]
+
+def _fresh_process_times(setup_code: str, stmt: str, repeat: int, setup=None) -> list[float]:
+    """
+    Time stmt in a fresh interpreter per repeat (after setup_code, untimed), for cases whose
+    cost sits in first imports that a warm process would skip. setup() runs before each.
+    """
+    code = f"import time\n{setup_code}\nt0 = time.perf_counter()\n{stmt}\nprint(time.perf_counter() - t0)"
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        times.append(float(_run_python(code).stdout.split()[-1]))
+    return times
+
+def collect_cases(repeat: int) -> dict[str, callable]:
+    """name -> zero-arg callable returning a list of timings (seconds)."""
+    import pandas as pd
+
+    import grid_core as gc
+    import sensitivity
+    import tables
+
+    xlsx = gc.scenario_path(BENCH_SCENARIO)
+    gwp = gc.GWP_AR6
+
+    def clear_stages():
+        for f in (gc._ingest, gc.breakdown_parameters, gc.mixing_weights, gc.embodied_weights,
+                  gc._compile_factor_set, gc.factor_tensors, gc.co2e_factors):
+            f.cache_clear()
+
+    def clear_params():
+        for p in gc.cache_dir("params").glob("*.json"):
+            p.unlink()
+
+    cases = {}
+    for m in IMPORT_MODULES:
+        cases[f"import:{m}"] = lambda m=m: _import_times(m, repeat)
+
+    cases["load_total_grid:parse"] = lambda: _timeit(lambda: gc.load_total_grid(xlsx, use_cache=False), repeat)
+    gc.load_total_grid(xlsx)  # populate the workbook cache
+    cases["load_total_grid:cached"] = lambda: _timeit(lambda: gc.load_total_grid(xlsx), repeat)
+    # the helper modules (specific_breakdowns, AESO/IESO extracts) must be imported afresh each run
+    cases["build_breakdown:no_artifact"] = lambda: _fresh_process_times(
+        "import grid_core", "grid_core.build_breakdown()", repeat, setup=clear_params)
+    cases["build_breakdown:warm"] = lambda: _timeit(gc.build_breakdown, repeat)
+
+    for sc in gc.scenarios():
+        path = gc.scenario_path(sc)
+        cases[f"compute_structures:{sc}"] = lambda path=path: _timeit(
+            lambda: gc.compute_structures(path, gwp), repeat, setup=clear_stages)
+    cases["compute_structures:gwp_change"] = lambda: _timeit(
+        lambda: gc.compute_structures(xlsx, {**gwp, "CH4": gwp["CH4"] + time.perf_counter() % 1}), repeat)
+    cases["compute_arrays:warm"] = lambda: _timeit(lambda: gc.compute_arrays(xlsx, gwp), repeat)
+
+    # a second factor set in a temporary directory: baseline_v1 with its operating factors x 1.1
+    alt_dir = Path(os.environ["CANGRID_CACHE_DIR"]) / "factor_sets"
+    alt_dir.mkdir(exist_ok=True)
+    base = gc.FACTOR_SET_DIR / gc.DEFAULT_FACTOR_SET
+    for suffix in (".toml", ".csv"):
+        shutil.copy(base.with_suffix(suffix), alt_dir / f"{gc.DEFAULT_FACTOR_SET}{suffix}")
+    shutil.copy(base.with_suffix(".toml"), alt_dir / "bench_alt.toml")
+    operating = pd.read_csv(base.with_suffix(".csv"), index_col="technology")
+    (operating * 1.1).to_csv(alt_dir / "bench_alt.csv")
+    gc.FACTOR_SET_DIR = alt_dir
+    swap = {"next": "bench_alt"}
+
+    def clear_factor_stages():
+        for f in (gc.factor_tensors, gc.co2e_factors):
+            f.cache_clear()
+        swap["next"] = gc.DEFAULT_FACTOR_SET if swap["next"] == "bench_alt" else "bench_alt"
+
+    # alternate between two factor sets: each compiled set and the mixing/embodied weights
+    # are kept, only the factor_tensors / co2e_factors products are redone
+    gc.compile_factor_set("bench_alt")
+    cases["compute_arrays:factor_set_swap"] = lambda: _timeit(
+        lambda: gc.compute_arrays(xlsx, gwp, factor_set=swap["next"]), repeat, setup=clear_factor_stages)
+    cases["compute_scenarios:all"] = lambda: _timeit(
+        lambda: gc.compute_scenarios(gc.scenarios(), gwp), repeat, setup=clear_stages)
+    cases["sensitivity:sobol_1024"] = lambda: _timeit(lambda: sensitivity.sobol_indices(xlsx, gwp, n=1024), repeat)
+
+    data = gc.compute_structures(xlsx, gwp)
+    builders = {
+        "table_mix_percent_single": lambda s: tables.table_mix_percent_single(data, s),
+        "table_mix_energy_single": lambda s: tables.table_mix_energy_single(data, s),
+        "table_contrib_single": lambda s: tables.table_contrib_single(data, s),
+        "table_co2e_share_single": lambda s: tables.table_co2e_share_single(data, s),
+        "table_emissions_split_single_year": lambda s: tables.table_emissions_split_single_year(data, s, 2025),
+    }
+    for name, build in builders.items():
+        # all 14 regions, as in a full multi-region render
+        cases[f"tables:{name}"] = lambda build=build: _timeit(lambda: [build(s) for s in gc.SECTORS], repeat)
+    return cases
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", nargs="+", default=None, help="run only cases whose name contains one of these")
+    ap.add_argument("--thresholds", type=Path, default=HERE / "thresholds.json")
+    ap.add_argument("--out", type=Path, default=HERE / "results")
+    ap.add_argument("--compare", type=Path, default=None, help="earlier results JSON to diff against")
+    args = ap.parse_args(argv)
+
+    thresholds = json.loads(args.thresholds.read_text()) if args.thresholds.exists() else {}
+    previous = json.loads(args.compare.read_text())["cases"] if args.compare else {}
+
+    results, failed = {}, []
+    for name, run in collect_cases(args.repeat).items():
+        if args.only and not any(o in name for o in args.only):
+            continue
+        times = run()
+        med = statistics.median(times)
+        results[name] = {"min": min(times), "median": med, "runs": len(times)}
+        limit = thresholds.get(name)
+        status = "" if limit is None else ("ok" if med <= limit else "SLOW")
+        if status == "SLOW":
+            failed.append(name)
+        delta = ""
+        if name in previous:
+            delta = f"{(med / previous[name]['median'] - 1) * 100:+6.1f}%"
+        print(f"{name:48s} median {med * 1e3:10.2f} ms  min {min(times) * 1e3:10.2f} ms  "
+              f"{'' if limit is None else f'limit {limit * 1e3:8.0f} ms':18s} {delta:8s} {status}")
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    report = {
+        "timestamp": stamp,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "cases": results,
+    }
+    out_file = args.out / f"{stamp}.json"
+    out_file.write_text(json.dumps(report, indent=2))
+    print(f"\nSaved {out_file}")
+    if failed:
+        print(f"Over threshold: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Lazily evaluated breakdown parameters (hydro/coal/natgas/oil splits, solar/wind capacity
+factors, AESO DDprojections and the IESO natgas split).
+
+Nothing is computed at import time. The first get_params() call looks for a compiled
+JSON artifact under cache_dir('params') keyed by the hashes of the input CSVs and of the
+modules that derive them; only on a miss are specific_breakdowns / AESO_Data_Extract /
+IESO_Data_Extract imported and run. AESO_natgas_ratios holds the per-year AB natgas
+CC/Cogen/SC split (2005-2050) for every AESO scenario. Module attributes
+(e.g. breakdown_params.DDprojections) resolve through get_params() as well.
+"""
+from __future__ import annotations
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from cache_utils import atomic_write, cache_dir, data_dir, file_digest
+
+# Bump when the artifact layout changes
+PARAMS_VERSION = 2
+
+INPUT_FILES = [
+    "Natgas_breakdown.csv",
+    "coal_breakdown(edited).csv",
+    "oil_breakdown(edited).csv",
+    "solar_breakdown.csv",
+    "wind_breakdown.csv",
+    "AESO.csv",
+    "IESO-Active-Contracted-Generation-List.csv",
+]
+MODEL_YEARS = list(range(2005, 2051))
+SOURCE_MODULES = ["specific_breakdowns.py", "AESO_Data_Extract.py", "IESO_Data_Extract.py"]
+
+# name -> columns kept from the source frame
+FRAME_COLUMNS = {
+    "hydro_breakdown":   ["res%", "riv%"],
+    "coal_breakdown":    ["bit%", "sub%", "lig%"],
+    "natgas_breakdown":  ["CC%", "CO%", "SC%"],
+    "oil_breakdown":     ["Heavy_Oil%", "Diesel%"],
+    "solar_breakdown":   ["cf"],
+    "wind_breakdown":    ["cf to 5%"],
+}
+
+def params_key() -> str:
+    """
+    Hash of the artifact version, every input CSV and the modules that derive the
+    parameters; the files are only re-hashed when one of them changes (mtime or size).
+    """
+    here = Path(__file__).resolve().parent
+    data = data_dir()
+    files = [data / name for name in INPUT_FILES] + [here / name for name in SOURCE_MODULES]
+    return _params_key(tuple((str(f), f.stat().st_mtime_ns, f.stat().st_size) for f in files))
+
+@lru_cache(maxsize=8)
+def _params_key(file_keys: tuple[tuple[str, int, int], ...]) -> str:
+    h = hashlib.sha256(f"v{PARAMS_VERSION}".encode())
+    for path, _, _ in file_keys:
+        h.update(file_digest(Path(path)).encode())
+    return h.hexdigest()
+
+def _compute() -> dict:
+    # Heavy imports only on a cache miss
+    import specific_breakdowns as sb
+    from AESO_Data_Extract import DDprojections, cube, natgas_projections, natgas_ratio_by_year
+    from IESO_Data_Extract import IESO_natgas_breakdown
+
+    out = {}
+    for name, cols in FRAME_COLUMNS.items():
+        df = getattr(sb, name)
+        out[name] = {c: {str(s): float(v) for s, v in df[c].items()} for c in cols}
+    out["DDprojections"] = {
+        "index": [int(y) for y in DDprojections.index],
+        "columns": {c: [float(v) for v in DDprojections[c]] for c in DDprojections.columns},
+    }
+    out["IESO_natgas_breakdown"] = {k: float(v) for k, v in IESO_natgas_breakdown.items()}
+    # per-year AB natgas ratios for every AESO scenario, over the model years
+    out["AESO_natgas_ratios"] = {}
+    for sc in cube.index.get_level_values("Scenario").unique():
+        r = natgas_ratio_by_year(natgas_projections(cube, sc), MODEL_YEARS)
+        out["AESO_natgas_ratios"][str(sc)] = {c: [float(v) for v in r[c]] for c in r.columns}
+    return out
+
+def _materialize(raw: dict) -> dict:
+    params = {name: pd.DataFrame(raw[name]) for name in FRAME_COLUMNS}
+    dd = raw["DDprojections"]
+    params["DDprojections"] = pd.DataFrame(dd["columns"], index=dd["index"])
+    params["IESO_natgas_breakdown"] = pd.Series(raw["IESO_natgas_breakdown"])
+    params["AESO_natgas_ratios"] = {
+        sc: pd.DataFrame(cols, index=MODEL_YEARS) for sc, cols in raw["AESO_natgas_ratios"].items()
+    }
+    return params
+
+@lru_cache(maxsize=1)
+def get_params() -> dict:
+    """All breakdown parameters as pandas objects, keyed by their historical module-level names."""
+    artifact = cache_dir("params") / f"params-{params_key()[:16]}.json"
+    if artifact.exists():
+        raw = json.loads(artifact.read_text())
+    else:
+        raw = _compute()
+        atomic_write(artifact, lambda tmp: tmp.write_text(json.dumps(raw)))
+    return _materialize(raw)
+
+def __getattr__(name: str):
+    if name in FRAME_COLUMNS or name in ("DDprojections", "IESO_natgas_breakdown", "AESO_natgas_ratios"):
+        return get_params()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
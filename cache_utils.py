@@ -0,0 +1,61 @@
+"""
+Small on-disk cache helpers shared by the model and the app.
+
+Everything lives under CANGRID_CACHE_DIR (default: <repo>/.cache). Entries are keyed
+by content hashes of their inputs, so stale files are simply never looked up again.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent
+
+def data_dir() -> Path:
+    """The repo's data/ folder (next to this file, one level up, or in the cwd), else CANGRID_DATA_DIR."""
+    candidates = [
+        ROOT / "data",
+        ROOT.parent / "data",
+        Path.cwd() / "data",
+        Path(os.getenv("CANGRID_DATA_DIR", "")).expanduser() if os.getenv("CANGRID_DATA_DIR") else None,
+    ]
+    for d in candidates:
+        if d and d.exists():
+            return d
+    raise FileNotFoundError(
+        "Could not find a 'data' directory.\n"
+        f"Tried: {[str(c) for c in candidates if c]}\n"
+        f"Current working directory: {Path.cwd()}"
+    )
+
+def cache_dir(*parts: str) -> Path:
+    base = Path(os.getenv("CANGRID_CACHE_DIR", "")).expanduser() if os.getenv("CANGRID_CACHE_DIR") else ROOT / ".cache"
+    d = base.joinpath(*parts)
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file's contents (hex)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def atomic_write(path: Path, write: Callable[[Path], None]) -> Path:
+    """
+    Call write(tmp_path) on a temp file next to `path`, then rename it into place,
+    so concurrent readers never see a half-written file.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(Path(tmp))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
@@ -4,27 +4,57 @@ import numpy as np
 
 
 
-from pathlib import Path
-import os
-
-def _guess_data_dir() -> Path:
-    here = Path(__file__).resolve().parent
-    # Probe a few common locations for a 'data' folder
-    candidates = [
-        here / 'data',
-        here.parent / 'data',
-        Path.cwd() / 'data',
-        Path(os.getenv('CANGRID_DATA_DIR', '')).expanduser() if os.getenv('CANGRID_DATA_DIR') else None,
-    ]
-    for d in candidates:
-        if d and d.exists():
-            return d
-    raise FileNotFoundError(
-        f"Could not find a 'data' directory. Tried: { [str(c) for c in candidates if c] }\n"
-        f"Current working directory: {Path.cwd()}\nScript location: {here}"
-    )
-
-DATA_DIR = _guess_data_dir()
+from cache_utils import data_dir
+
+DATA_DIR = data_dir()
+
+sectors = ['Canada','AB','BC','MB','NB','NL','NT','NS','NU','ON','PE','QC','SK','YT']
+
+# Registry province names -> sector codes (codes themselves are accepted as well)
+PROVINCE_CODES = {
+    'Alberta': 'AB', 'British Columbia': 'BC', 'Manitoba': 'MB', 'New Brunswick': 'NB',
+    'Newfoundland and Labrador': 'NL', 'Northwest Territories': 'NT', 'Nova Scotia': 'NS',
+    'Nunavut': 'NU', 'Ontario': 'ON', 'Prince Edward Island': 'PE', 'Quebec': 'QC',
+    'Saskatchewan': 'SK', 'Yukon': 'YT',
+    **{s: s for s in sectors},
+}
+
+def fill_national(df: pd.DataFrame, national: str = 'Canada', digits: int = 3) -> pd.DataFrame:
+    """Missing values (e.g. 0/0 shares of a province without plants) take the national row; all rounded."""
+    return df.fillna(df.loc[national]).round(digits)
+
+def registry_energy(plants: pd.DataFrame, class_cf: dict, catch_all: str | None = None,
+                    province: str = 'Province', kind: str = 'Type of plant',
+                    capacity: str = 'MWh Capacity') -> pd.DataFrame:
+    """
+    Capacity-factor-weighted output per sector and plant class from a plant registry:
+    each plant adds int(capacity * cf) to its class (truncated per plant), summed per
+    province in one groupby; the national row sums every plant, including those whose
+    province is not a sector. `catch_all` names a class that every plant is added to
+    regardless of its own class. Raises ValueError if a plant's output is not finite.
+    """
+    cap = plants[capacity].to_numpy(dtype=float)
+    kinds = plants[kind].to_numpy(dtype=object)
+    columns = {}
+    for cls, cf in class_cf.items():
+        member = np.ones(len(plants), dtype=bool) if cls == catch_all else kinds == cls
+        output = cap[member] * cf
+        if not np.isfinite(output).all():
+            bad = plants.index[member][~np.isfinite(output)]
+            raise ValueError(f"{cls}: non-finite capacity x cf for plant rows {list(bad)}")
+        columns[cls] = np.zeros(len(plants), dtype=np.int64)
+        columns[cls][member] = np.trunc(output)
+    per_plant = pd.DataFrame(columns)
+    codes = plants[province].map(PROVINCE_CODES).to_numpy(dtype=object)
+    by_sector = per_plant.groupby(codes).sum().reindex(sectors, fill_value=0)
+    by_sector.loc['Canada'] = per_plant.sum()
+    return by_sector
+
+def registry_shares(energy: pd.DataFrame, share_order=None) -> pd.DataFrame:
+    """Class totals, 'Total' and '<class>%' shares per sector, national shares where a sector has none."""
+    total = energy.sum(axis=1).rename('Total')
+    shares = energy.div(total, axis=0)[list(share_order or energy.columns)].add_suffix('%')
+    return fill_national(pd.concat([energy, total, shares], axis=1))
 
 ##########natgas_breakdown
 filepath = DATA_DIR / 'Natgas_breakdown.csv'
@@ -32,78 +62,25 @@ filepath = DATA_DIR / 'Natgas_breakdown.csv'
 natgas_plant_list = pd.read_csv(filepath)
 natgas_plant_list = natgas_plant_list.drop(columns=['CO','Cogeneration','bruh'])
 
-for i in range(len(natgas_plant_list)):
-    if natgas_plant_list['Province'][i] == 'Alberta':
-        natgas_plant_list.loc[i,'Province'] = 'AB'
-    if natgas_plant_list['Province'][i] == 'British Columbia':
-        natgas_plant_list.loc[i,'Province'] = 'BC'
-    if natgas_plant_list['Province'][i] == 'Manitoba':
-        natgas_plant_list.loc[i,'Province'] = 'MB'
-    if natgas_plant_list['Province'][i] == 'New Brunswick':
-        natgas_plant_list.loc[i,'Province'] = 'NB'
-    if natgas_plant_list['Province'][i] == 'Nova Scotia':
-        natgas_plant_list.loc[i,'Province'] = 'NS'
-    if natgas_plant_list['Province'][i] == 'Ontario':
-        natgas_plant_list.loc[i,'Province'] = 'ON'
-    if natgas_plant_list['Province'][i] == 'Saskatchewan':
-        natgas_plant_list.loc[i,'Province'] = 'SK'
-    if natgas_plant_list['Province'][i] == 'Quebec':
-        natgas_plant_list.loc[i,'Province'] = 'QC'
-
-sectors = ['Canada','AB','BC','MB','NB','NL','NT','NS','NU','ON','PE','QC','SK','YT']
-natgas_breakdown_dict = {}
-for i in range(len(sectors)):
-    natgas_breakdown_dict[sectors[i]] = []
-for i in range(len(natgas_plant_list)):
-    for j in range(len(sectors)):
-        if natgas_plant_list['Province'][i] == sectors[j]:
-            natgas_breakdown_dict[sectors[j]].append([natgas_plant_list['Type of plant'][i],natgas_plant_list['MWh Capacity'][i]])
-for i in range(len(natgas_plant_list)):
-    natgas_breakdown_dict['Canada'].append([natgas_plant_list['Type of plant'][i],natgas_plant_list['MWh Capacity'][i]])
-    
-natgas_breakdown = pd.DataFrame(
-    {'CO':[0,0,0,0,0,0,0,0,0,0,0,0,0,0],
-     'CC':[0,0,0,0,0,0,0,0,0,0,0,0,0,0],
-     'SC':[0,0,0,0,0,0,0,0,0,0,0,0,0,0]},
-    index = sectors)
-
 #capacity factors (assuming all gas turbines if not CC, which should be correcct): https://www.eia.gov/electricity/monthly/epm_table_grapher.php?t=epmt_6_07_a
 CC_cf = 0.141
 CO_cf = 0.588
 SC_cf = CC_cf
 
-for j in range(len(sectors)):
-    for k in range(len(natgas_breakdown_dict[sectors[j]])):
-        if natgas_breakdown_dict[sectors[j]][k][0] == 'CC':
-            natgas_breakdown.loc[sectors[j],'CC'] = natgas_breakdown.loc[sectors[j],'CC'] + int(natgas_breakdown_dict[sectors[j]][k][1] * CC_cf)
-        if natgas_breakdown_dict[sectors[j]][k][0] == 'CO':
-            natgas_breakdown.loc[sectors[j],'CO'] = natgas_breakdown.loc[sectors[j],'CO'] + int(natgas_breakdown_dict[sectors[j]][k][1] * CO_cf)
-        if natgas_breakdown_dict[sectors[j]][k][0] == 'SC' or 'X': #to be conservative, all that isn't classified is put under the least efficient single cycle, BUT CHANGES VALUES A LOT
-            natgas_breakdown.loc[sectors[j],'SC'] = natgas_breakdown.loc[sectors[j],'SC'] + int(natgas_breakdown_dict[sectors[j]][k][1] * SC_cf)
-            
-natgas_breakdown['Total'] = natgas_breakdown['CC'] + natgas_breakdown['CO'] + natgas_breakdown['SC']
-natgas_breakdown['CC%'] = natgas_breakdown['CC'] / natgas_breakdown['Total']
-natgas_breakdown['CO%'] = natgas_breakdown['CO'] / natgas_breakdown['Total']
-natgas_breakdown['SC%'] = natgas_breakdown['SC'] / natgas_breakdown['Total']
-
-natgas_breakdown = natgas_breakdown.replace(np.nan,123456)
-
-for i in range(len(natgas_breakdown.columns)):
-    for j in range(len(natgas_breakdown.index)):
-        if natgas_breakdown[natgas_breakdown.columns[i]][natgas_breakdown.index[j]] == 123456:
-            natgas_breakdown.loc[natgas_breakdown.index[j], natgas_breakdown.columns[i]] = natgas_breakdown[natgas_breakdown.columns[i]]['Canada']
-        natgas_breakdown.loc[natgas_breakdown.index[j], natgas_breakdown.columns[i]] = round(natgas_breakdown.loc[natgas_breakdown.index[j], natgas_breakdown.columns[i]],3)
-            
+# to be conservative, all that isn't classified is put under the least efficient single cycle
+# (BUT CHANGES VALUES A LOT); as historically computed, every plant, classified or not, is
+# also counted under SC
+natgas_energy = registry_energy(natgas_plant_list, {'CO': CO_cf, 'CC': CC_cf, 'SC': SC_cf}, catch_all='SC')
+natgas_breakdown = registry_shares(natgas_energy, share_order=['CC', 'CO', 'SC'])
+
 ################hydro_breakdown
 sectors = ['Canada','AB','BC','MB','NB','NL','NT','NS','NU','ON','PE','QC','SK','YT']
 # from: https://www.canada.ca/en/environment-climate-change/services/managing-pollution/fuel-life-cycle-assessment-model/methodology.html#toc21
 hydro_breakdown = pd.DataFrame({'res%':[0.78,0.66,0.95,0.998,0.91,0.97,0.56,0,0,0.856,0,0.629,0.97,0]}, index = sectors) #from https://www.canada.ca/en/environment-climate-change/services/managing-pollution/fuel-life-cycle-assessment-model/methodology.html#toc21
 hydro_breakdown['riv%'] = 1 - hydro_breakdown['res%']
-for i in range(len(hydro_breakdown)):
-    if hydro_breakdown.loc[sectors[i],'res%'] == 0:
-        hydro_breakdown.loc[sectors[i],'res%'] = 0.50
-        hydro_breakdown.loc[sectors[i],'riv%'] = 0.50
-    hydro_breakdown.loc[sectors[i],'riv%'] = round(hydro_breakdown.loc[sectors[i],'riv%'],3)
+no_split = hydro_breakdown['res%'] == 0
+hydro_breakdown.loc[no_split, ['res%', 'riv%']] = 0.50
+hydro_breakdown['riv%'] = hydro_breakdown['riv%'].round(3)
 
 ################coal_breakdown
 filepath = DATA_DIR / 'coal_breakdown(edited).csv'
@@ -119,13 +96,7 @@ coal_breakdown['bit%'] = coal_breakdown['bit'] / coal_breakdown['total']
 coal_breakdown['sub%'] = coal_breakdown['sub'] / coal_breakdown['total']
 coal_breakdown['lig%'] = coal_breakdown['lig'] / coal_breakdown['total']
 
-coal_breakdown = coal_breakdown.replace(np.nan,123456123456)
-
-for i in range(len(coal_breakdown.columns)):
-    for j in range(len(coal_breakdown.index)):
-        if coal_breakdown[coal_breakdown.columns[i]][coal_breakdown.index[j]] == 123456123456:
-            coal_breakdown.loc[coal_breakdown.index[j], coal_breakdown.columns[i]] = coal_breakdown[coal_breakdown.columns[i]]['Canada']
-        coal_breakdown.loc[coal_breakdown.index[j], coal_breakdown.columns[i]] = round(coal_breakdown.loc[coal_breakdown.index[j], coal_breakdown.columns[i]],3)
+coal_breakdown = fill_national(coal_breakdown)
 ################oil_breakdown
 filepath = DATA_DIR / 'oil_breakdown(edited).csv'
 #same source as coal_breakdown
@@ -142,9 +113,8 @@ oil_breakdown['Diesel%'] = oil_breakdown['Diesel'] / oil_breakdown['Total']
 
 oil_breakdown.index = ['Canada','NL','PE','NS','NB','QC','ON','MB','SK','AB','BC','YT','NT','NU']
 
-for i in range(len(oil_breakdown)):
-    for j in ['Heavy_Oil%','Diesel%']:
-        oil_breakdown.loc[sectors[i],j] = round(oil_breakdown.loc[sectors[i],j],3)
+oil_shares = ['Heavy_Oil%','Diesel%']
+oil_breakdown[oil_shares] = oil_breakdown[oil_shares].astype(float).round(3)
 oil_breakdown.loc['PE','Heavy_Oil%'] = 0.500
 oil_breakdown.loc['PE','Diesel%'] = 0.500
 oil_breakdown['Total%'] = oil_breakdown['Heavy_Oil%'] + oil_breakdown['Diesel%']
@@ -0,0 +1,38 @@
+# tests/test_attribution.py
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from attribution import intensity_attribution, lmdi
+from grid_core import GWP_AR5, GWP_AR6, compute_arrays, scenario_path, scenarios
+
+def test_lmdi_terms_sum_to_change():
+    rng = np.random.default_rng(0)
+    share0, share1 = rng.dirichlet(np.ones(8), size=(2, 50))
+    factor0, factor1 = rng.uniform(0.01, 1.0, size=(2, 50, 8))
+    # absent sources and unchanged terms
+    share0[:5, 0] = 0.0
+    share1[5:10, 1] = 0.0
+    factor1[10:15] = factor0[10:15]
+    eff = lmdi(share0, factor0, share1, factor1)
+    np.testing.assert_allclose(eff["mix"] + eff["factor"], share1 * factor1 - share0 * factor0, atol=1e-15)
+    assert np.all(eff["factor"][:5, 0] == 0.0) and np.all(eff["factor"][5:10, 1] == 0.0)
+    np.testing.assert_allclose(eff["factor"][10:15], 0.0, atol=1e-15)
+
+def test_scenario_pair_sums_to_intensity_change():
+    base = compute_arrays(scenario_path(scenarios()[0]), GWP_AR6)
+    other = compute_arrays(scenario_path(scenarios()[-1]), GWP_AR6)
+    attr = intensity_attribution(base, other)
+    assert attr["mix"].shape == base["share"].shape
+    total = (attr["mix"] + attr["factor"]).sum(axis=-1)
+    np.testing.assert_allclose(total, other["intensity"] - base["intensity"], rtol=1e-9, atol=1e-15)
+    np.testing.assert_allclose(attr["delta"], other["intensity"] - base["intensity"], rtol=1e-9, atol=1e-15)
+
+def test_gwp_only_baseline_is_all_factor_effect():
+    xlsx = scenario_path(scenarios()[-1])
+    attr = intensity_attribution(compute_arrays(xlsx, GWP_AR5), compute_arrays(xlsx, GWP_AR6))
+    np.testing.assert_allclose(attr["mix"], 0.0, atol=1e-15)
+    np.testing.assert_allclose(attr["factor"].sum(axis=-1), attr["other"] - attr["base"], rtol=1e-9, atol=1e-15)
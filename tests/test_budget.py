@@ -0,0 +1,27 @@
+# tests/test_budget.py
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from budget import cumulative, exhaustion_year
+from grid_core import YEARS
+
+def _cum(start_year=None):
+    annual = np.ones((2, len(YEARS)))                     # 1 unit per year, two regions
+    return cumulative(annual, start_year=start_year)
+
+def test_exhaustion_year_counts_from_start():
+    years = exhaustion_year(_cum(2020), [1.0, 5.0], start_year=2020)
+    np.testing.assert_array_equal(years, [[2020, 2020], [2024, 2024]])
+
+def test_budget_at_or_below_zero_is_used_up_in_start_year():
+    years = exhaustion_year(_cum(2020), [0.0, -3.0], start_year=2020)
+    np.testing.assert_array_equal(years, [[2020, 2020], [2020, 2020]])
+    # without a start year the first model year
+    np.testing.assert_array_equal(exhaustion_year(_cum(), 0.0), [int(YEARS[0])] * 2)
+
+def test_budget_lasting_past_horizon_is_nan():
+    assert np.isnan(exhaustion_year(_cum(2020), 1e6, start_year=2020)).all()
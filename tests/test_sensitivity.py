@@ -0,0 +1,48 @@
+# tests/test_sensitivity.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from grid_core import GWP_AR6, scenario_path, scenarios
+from sensitivity import GROUPS, PARAMETERS, evaluate, model_inputs, saltelli, tornado
+
+# intensity is linear in these multipliers: operating factors and embodied factors
+LINEAR = [i for i, g in enumerate(GROUPS) if g in ("proc", "embodied")]
+
+@pytest.fixture(scope="module")
+def xlsx():
+    return scenario_path(scenarios()[-1])
+
+def test_tornado_is_monotone_and_symmetric_on_linear_parameters(xlsx):
+    res = tornado(xlsx, GWP_AR6, spread=0.2)
+    low, high, point = res["low"][LINEAR], res["high"][LINEAR], res["point"]
+    tol = 1e-12 * np.abs(point).max()
+    assert np.all(low <= point + tol) and np.all(point <= high + tol)
+    np.testing.assert_allclose(high - point, point - low, rtol=1e-9, atol=tol)
+    # at least one swing has to move intensity
+    assert (high - low).max() > 0
+
+def test_linear_parameter_sweep_is_monotone(xlsx):
+    inputs = model_inputs(xlsx, GWP_AR6)
+    steps = np.linspace(0.5, 1.5, 11)
+    for name in ("coal_bit CO2", "natgas_comb CO2", "embodied Wind"):
+        x = np.ones((len(steps), len(PARAMETERS)))
+        x[:, PARAMETERS.index(name)] = steps
+        out = evaluate(inputs, x)
+        assert np.all(np.diff(out, axis=0) >= -1e-12), name
+        np.testing.assert_allclose(np.diff(out, n=2, axis=0), 0.0, atol=1e-9, err_msg=name)
+
+def test_saltelli_first_order_sums_to_one_for_additive_function():
+    coef = np.array([[4.0, 1.0], [2.0, 1.0], [1.0, 1.0], [0.0, 1.0]])    # (d, m): two additive outputs
+    lo, hi = np.zeros(len(coef)), np.ones(len(coef))
+    res = saltelli(lambda x: x @ coef, lo, hi, n=8192, seed=3)
+    exact = coef ** 2 / (coef ** 2).sum(axis=0)                          # uniform inputs: S_i = a_i^2 / sum a^2
+    np.testing.assert_allclose(res["first"].sum(axis=0), 1.0, atol=0.05)
+    np.testing.assert_allclose(res["first"], exact, atol=0.05)
+    # no interactions: total == first
+    np.testing.assert_allclose(res["total"], res["first"], atol=0.05)
+    np.testing.assert_allclose(res["variance"], (coef ** 2).sum(axis=0) / 12, rtol=0.05)
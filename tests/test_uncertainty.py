@@ -0,0 +1,52 @@
+# tests/test_uncertainty.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from grid_core import AESO_SCENARIO, DEFAULT_FACTOR_SET, GWP_AR6, scenario_path, scenarios
+from uncertainty import DRAW_BLOCK, _model_inputs, block_draws, monte_carlo_intensity
+
+N_DRAWS = 2_500
+BINS = 4096
+
+@pytest.fixture(scope="module")
+def xlsx():
+    return scenario_path(scenarios()[-1])
+
+@pytest.fixture(scope="module")
+def result(xlsx):
+    return monte_carlo_intensity(xlsx, GWP_AR6, n_draws=N_DRAWS, chunk_size=1_000, bins=BINS, seed=7)
+
+def _assert_same(a, b):
+    for k in ("mean", "std", "min", "max", "point"):
+        np.testing.assert_allclose(a[k], b[k], rtol=1e-12, atol=0, err_msg=k)
+    for q in a["percentiles"]:
+        np.testing.assert_allclose(a["percentiles"][q], b["percentiles"][q], rtol=1e-12, atol=0, err_msg=f"p{q}")
+
+def test_fixed_seed_is_reproducible(xlsx, result):
+    _assert_same(result, monte_carlo_intensity(xlsx, GWP_AR6, n_draws=N_DRAWS, chunk_size=1_000, bins=BINS, seed=7))
+    other = monte_carlo_intensity(xlsx, GWP_AR6, n_draws=N_DRAWS, chunk_size=1_000, bins=BINS, seed=8)
+    assert not np.allclose(result["mean"], other["mean"])
+
+def test_chunking_does_not_change_result(xlsx, result):
+    _assert_same(result, monte_carlo_intensity(xlsx, GWP_AR6, n_draws=N_DRAWS, chunk_size=N_DRAWS, bins=BINS, seed=7))
+    _assert_same(result, monte_carlo_intensity(xlsx, GWP_AR6, n_draws=N_DRAWS, chunk_size=1, bins=BINS, seed=7))
+    _assert_same(result, monte_carlo_intensity(xlsx, GWP_AR6, n_draws=N_DRAWS, chunk_size=1_000, bins=BINS, seed=7,
+                                               workers=2))
+
+def test_histogram_percentiles_match_np_percentile(xlsx, result):
+    inputs = _model_inputs(xlsx, GWP_AR6, "kg", AESO_SCENARIO, DEFAULT_FACTOR_SET)
+    blocks = [(i, min(DRAW_BLOCK, N_DRAWS - s)) for i, s in enumerate(range(0, N_DRAWS, DRAW_BLOCK))]
+    draws = block_draws(inputs, blocks, 7, 0.2, 0.1)
+    np.testing.assert_allclose(result["mean"], draws.mean(axis=0), rtol=1e-9)
+    np.testing.assert_allclose(result["std"], draws.std(axis=0, ddof=1), rtol=1e-6)
+    # the histogram resolves a percentile to within one bin of the order statistics around it
+    tol = 2.0 * result["max"] / BINS
+    for q, band in result["percentiles"].items():
+        lower = np.percentile(draws, q, axis=0, method="lower")
+        higher = np.percentile(draws, q, axis=0, method="higher")
+        assert np.all(band >= lower - tol) and np.all(band <= higher + tol), f"p{q}"